@@ -1,9 +1,219 @@
-import ads
 import datetime
+import json
+import sqlite3
+import threading
+import time
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
+from names import author_query, first_initial_and_last_name
 
-def get_ads_papers(query, astronomy_collection=True, past_week=False, allowed_types=["article", "eprint"]):
-    """Get papers from NASA/ADS based on a query
+
+# fields that we need to build the paper dictionaries
+PAPER_FIELDS = ["abstract", "author", "citation_count", "doctype", "first_author", "read_count", "title",
+                "bibcode", "pubdate"]
+
+# extra fields needed to work out who wrote which paper in a batched query
+ORCID_FIELDS = ["orcid_pub", "orcid_user", "orcid_other"]
+
+
+class ResultCache:
+    """A persistent cache of ADS search results, stored in an SQLite database so it survives restarts
+
+    Results younger than ``ttl`` are returned straight away. Results older than that (but younger than
+    ``stale_ttl``) are still returned straight away but are also refreshed in the background
+    (stale-while-revalidate). Anything older is fetched again before returning. Once there are more than
+    ``max_entries`` results, the least recently used ones are evicted.
+
+    Parameters
+    ----------
+    path : `str`, optional
+        Path to the database file, by default "private_data/ads_cache.sqlite"
+    ttl : `float`, optional
+        How many seconds results are fresh for, by default 1 hour
+    stale_ttl : `float`, optional
+        How many seconds stale results can still be used for while they refresh, by default 1 week
+    max_entries : `int`, optional
+        Maximum number of results to keep, by default 2000
+    """
+    def __init__(self, path="private_data/ads_cache.sqlite", ttl=60 * 60, stale_ttl=7 * 24 * 60 * 60,
+                 max_entries=2000):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+
+        self.lock = threading.Lock()
+        self.connection = None
+        self.refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ads-cache-refresh")
+        self.refreshing = set()
+        self.hits, self.stale_hits, self.misses = 0, 0, 0
+
+    def _connect(self):
+        # only open the database the first time we need it
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT, "
+                                    "fetched REAL, last_used REAL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        return self.connection
+
+    def get(self, key, fetch):
+        """Get a result from the cache, using ``fetch`` to get it from ADS if needed
+
+        Parameters
+        ----------
+        key : `str`
+            Key for the result
+        fetch : `function`
+            Function that takes no arguments and returns the (JSON serialisable) result
+
+        Returns
+        -------
+        value
+            The result
+        """
+        now = time.time()
+        with self.lock:
+            connection = self._connect()
+            row = connection.execute("SELECT value, fetched FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] < self.stale_ttl:
+                connection.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+                connection.commit()
+                if now - row[1] < self.ttl:
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+                    if key not in self.refreshing:
+                        self.refreshing.add(key)
+                        self.refresher.submit(self._refresh, key, fetch)
+                return json.loads(row[0])
+            self.misses += 1
+
+        value = fetch()
+        self._store(key, value)
+        return value
+
+    def _refresh(self, key, fetch):
+        try:
+            self._store(key, fetch())
+        except Exception as e:
+            print(f"WARNING: failed to refresh cached ADS result for '{key}':", e)
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+    def _store(self, key, value):
+        now = time.time()
+        with self.lock:
+            connection = self._connect()
+            connection.execute("INSERT OR REPLACE INTO results (key, value, fetched, last_used) "
+                               "VALUES (?, ?, ?, ?)", (key, json.dumps(value), now, now))
+
+            # evict the least recently used results if we have too many
+            n_results = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            if n_results > self.max_entries:
+                connection.execute("DELETE FROM results WHERE key IN (SELECT key FROM results "
+                                   "ORDER BY last_used LIMIT ?)", (n_results - self.max_entries,))
+            connection.commit()
+
+    def stats(self):
+        """Get a dictionary with the number of hits, stale hits and misses, and the overall hit rate"""
+        with self.lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            hit_rate = (self.hits + self.stale_hits) / lookups if lookups > 0 else 0.0
+            return {"hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses,
+                    "hit_rate": hit_rate}
+
+
+# the cache used for all ADS searches
+ADS_CACHE = ResultCache()
+
+
+def iter_search(query, fl=PAPER_FIELDS, rows=50, max_pages=1, allowed_types=None):
+    """Lazily iterate over the results of an ADS search (sorted by date)
+
+    Pages of ``rows`` results are only fetched from ADS as the generator is consumed, so stopping early
+    means that no more pages are requested.
+
+    Parameters
+    ----------
+    query : `str`
+        Full query used for ADS searchs
+    fl : `list`, optional
+        Fields to return, by default ``PAPER_FIELDS``
+    rows : `int`, optional
+        Number of results in each page, by default 50
+    max_pages : `int`, optional
+        Maximum number of pages to fetch, by default 1
+    allowed_types : `list`, optional
+        List of allowed types of papers, by default None (allow everything)
+
+    Yields
+    ------
+    result : `dict`
+        The raw fields of each result
+    """
+    # ads is slow to import so wait until we first search
+    import ads
+
+    for article in ads.SearchQuery(q=query, sort="date", fl=fl, rows=rows, max_pages=max_pages):
+        result = dict(article.items())
+        if allowed_types is None or result.get("doctype") in allowed_types:
+            yield result
+
+
+def search_ads(query, fl=PAPER_FIELDS, rows=50, max_pages=1, allowed_types=None, limit=None,
+               use_cache=True):
+    """Run an ADS search (sorted by date), going through the result cache
+
+    Parameters
+    ----------
+    query : `str`
+        Full query used for ADS searchs
+    fl : `list`, optional
+        Fields to return, by default ``PAPER_FIELDS``
+    rows : `int`, optional
+        Number of results in each page, by default 50
+    max_pages : `int`, optional
+        Maximum number of pages to fetch, by default 1
+    allowed_types : `list`, optional
+        List of allowed types of papers, by default None (allow everything)
+    limit : `int`, optional
+        Stop fetching once we have this many (allowed) results, by default None (no limit)
+    use_cache : `bool`, optional
+        Whether to use the result cache, by default True
+
+    Returns
+    -------
+    results : `list` of `dicts`
+        The raw fields of each result
+    """
+    def fetch():
+        return list(islice(iter_search(query, fl=fl, rows=rows, max_pages=max_pages,
+                                       allowed_types=allowed_types), limit))
+
+    if not use_cache:
+        return fetch()
+
+    # normalise the query so that trivial differences in whitespace still hit the cache
+    key = "|".join([" ".join(query.split()), ",".join(sorted(fl)), str(rows), str(max_pages),
+                    ",".join(sorted(allowed_types)) if allowed_types is not None else "*", str(limit)])
+    return ADS_CACHE.get(key, fetch)
+
+
+def page_size(limit):
+    """Choose how many results to ask ADS for in each page when we want ``limit`` papers
+
+    We ask for a bit more than the limit since some results get filtered out by their doctype.
+    """
+    if limit is None:
+        return 50
+    return min(max(2 * limit, 5), 200)
+
+
+def build_query(query, astronomy_collection=True, past_week=False):
+    """Add the collection and date restrictions to an ADS query
 
     Parameters
     ----------
@@ -13,8 +223,11 @@ def get_ads_papers(query, astronomy_collection=True, past_week=False, allowed_ty
         Whether to restrict to the astronomy collection, by default True
     past_week : `bool`, optional
         Whether to restrict to papers from the past week, by default False
-    allowed_types : `list`, optional
-        List of allowed types of papers, by default ["article", "eprint"]
+
+    Returns
+    -------
+    query : `str`
+        Full query
     """
     # append astronomy collection to query if wanted
     if astronomy_collection:
@@ -28,27 +241,264 @@ def get_ads_papers(query, astronomy_collection=True, past_week=False, allowed_ty
 
         # restrict the entdates to the date range of last week
         query += f" entdate:[{week_ago.strftime('%Y-%m-%d')} TO {today.strftime('%Y-%m-%d')}]"
+    return query
+
+
+def paper_to_dict(paper):
+    """Convert the raw fields of an ADS result into the dictionary format used by Gerald"""
+    year, month, _ = map(int, paper["pubdate"].split("-"))
+    return {
+        "link": f"https://ui.adsabs.harvard.edu/abs/{paper['bibcode']}/abstract",
+        "title": paper["title"][0],
+        "abstract": paper.get("abstract"),
+        "authors": paper["author"],
+        "date": datetime.date(year=year, month=month, day=1),
+        "citations": paper.get("citation_count"),
+        "reads": paper.get("read_count"),
+    }
+
+
+def get_ads_papers(query, astronomy_collection=True, past_week=False, allowed_types=["article", "eprint"],
+                   limit=None, with_abstracts=True):
+    """Get papers from NASA/ADS based on a query
+
+    Parameters
+    ----------
+    query : `str`
+        Query used for ADS searchs
+    astronomy_collection : `bool`, optional
+        Whether to restrict to the astronomy collection, by default True
+    past_week : `bool`, optional
+        Whether to restrict to papers from the past week, by default False
+    allowed_types : `list`, optional
+        List of allowed types of papers, by default ["article", "eprint"]
+    limit : `int`, optional
+        Maximum number of papers, pages are only fetched from ADS until we have this many, by default None
+        (a single page of 50 results)
+    with_abstracts : `bool`, optional
+        Whether to fetch the abstracts, by default True
+    """
+    query = build_query(query, astronomy_collection=astronomy_collection, past_week=past_week)
+    fl = PAPER_FIELDS if with_abstracts else [field for field in PAPER_FIELDS if field != "abstract"]
 
     # get the papers
-    papers = ads.SearchQuery(q=query, sort="date", fl=["abstract", "author", "citation_count", "doctype",
-                                                       "first_author", "read_count", "title", "bibcode",
-                                                       "pubdate"])
-
-    papers_dict_list = []
-
-    for paper in papers:
-        if paper.doctype in allowed_types:
-            year, month, _ = map(int, paper.pubdate.split("-"))
-            papers_dict_list.append({
-                "link": f"https://ui.adsabs.harvard.edu/abs/{paper.bibcode}/abstract",
-                "title": paper.title[0],
-                "abstract": paper.abstract,
-                "authors": paper.author,
-                "date": datetime.date(year=year, month=month, day=1),
-                "citations": paper.citation_count,
-                "reads": paper.read_count,
-            })
-    return papers_dict_list
+    if limit is None:
+        papers = search_ads(query, fl=fl, allowed_types=allowed_types)
+    else:
+        papers = search_ads(query, fl=fl, rows=page_size(limit), max_pages=10, allowed_types=allowed_types,
+                            limit=limit)
+    return [paper_to_dict(paper) for paper in papers]
+
+
+def is_author(paper, name, orcid=None):
+    """Check whether a person is an author of an ADS article
+
+    If we know their ORCID ID then we check the ORCID fields, otherwise we check the last name and first
+    initial of each author (the same thing an ``author:"Last, F"`` query matches on).
+
+    Parameters
+    ----------
+    paper : `dict`
+        Raw fields of an ADS result (which must have been fetched with the ``ORCID_FIELDS``)
+    name : `str`
+        Full name of the person
+    orcid : `str`, optional
+        ORCID ID of the person, by default None
+
+    Returns
+    -------
+    is_author : `bool`
+        Whether they are an author
+    """
+    if orcid is not None:
+        return any(orcid in (paper.get(field) or []) for field in ORCID_FIELDS)
+
+    first_initial, last_name = (part.casefold() for part in first_initial_and_last_name(name))
+    for author in paper.get("author") or []:
+        author_last, _, author_first = author.partition(", ")
+        if author_last.casefold() == last_name and author_first[:1].casefold() == first_initial:
+            return True
+    return False
+
+
+def get_ads_papers_batch(people, batch_size=20, rows=200, min_papers=1, astronomy_collection=True,
+                         past_week=False, allowed_types=["article", "eprint"], limit=None,
+                         with_abstracts=True):
+    """Get papers from NASA/ADS for many people at once by OR-ing their queries together
+
+    Parameters
+    ----------
+    people : `list` of `tuples`
+        Each tuple is (name, orcid) for a person (orcid can be None)
+    batch_size : `int`, optional
+        Maximum number of people in a single ADS query, by default 20
+    rows : `int`, optional
+        Maximum number of papers to fetch for each batch, by default 200
+    min_papers : `int`, optional
+        If a batch hits the ``rows`` limit (counting every result, not just those of an allowed type),
+        anyone with fewer than this many papers is searched for individually (since their papers may have
+        been crowded out), by default 1
+    astronomy_collection : `bool`, optional
+        Whether to restrict to the astronomy collection, by default True
+    past_week : `bool`, optional
+        Whether to restrict to papers from the past week, by default False
+    allowed_types : `list`, optional
+        List of allowed types of papers, by default ["article", "eprint"]
+    limit : `int`, optional
+        Maximum number of papers for each person, by default None (no limit). If given then each batch only
+        asks for about as many results as that would need (up to ``rows``).
+    with_abstracts : `bool`, optional
+        Whether to fetch the abstracts, by default True
+
+    Returns
+    -------
+    papers : `list` of `lists`
+        Papers for each person (in the same order as ``people``)
+    """
+    fl = PAPER_FIELDS if with_abstracts else [field for field in PAPER_FIELDS if field != "abstract"]
+    papers = [[] for _ in people]
+    for start in range(0, len(people), batch_size):
+        batch = people[start:start + batch_size]
+        query = "(" + " OR ".join(author_query(name, orcid) for name, orcid in batch) + ")"
+        query = build_query(query, astronomy_collection=astronomy_collection, past_week=past_week)
+
+        # get the papers and work out whose they are (only asking for as many as we need)
+        batch_rows = rows if limit is None else min(rows, page_size(limit * len(batch)))
+        results = search_ads(query, fl=fl + ORCID_FIELDS, rows=batch_rows)
+        for paper in results:
+            if paper.get("doctype") not in allowed_types:
+                continue
+            paper_dict = None
+            for i, (name, orcid) in enumerate(batch):
+                if is_author(paper, name, orcid):
+                    paper_dict = paper_to_dict(paper) if paper_dict is None else paper_dict
+                    papers[start + i].append(paper_dict)
+
+        # if we got as many results as we asked for then some people may have been crowded out (this counts
+        # every result since the ones we filter out by type still took up space in the batch)
+        if len(results) >= batch_rows:
+            for i, (name, orcid) in enumerate(batch):
+                if len(papers[start + i]) < min_papers:
+                    papers[start + i] = get_ads_papers(author_query(name, orcid),
+                                                       astronomy_collection=astronomy_collection,
+                                                       past_week=past_week, allowed_types=allowed_types,
+                                                       limit=limit, with_abstracts=with_abstracts)
+
+    # results are sorted by date so each person's most recent papers come first
+    if limit is not None:
+        papers = [person_papers[:limit] for person_papers in papers]
+    return papers
+
+
+def get_people_papers(people, batch_size=20, **kwargs):
+    """Get papers for several people, batching together anyone who doesn't need a custom query
+
+    Parameters
+    ----------
+    people : `list` of `tuples`
+        Each tuple is (name, orcid, query) for a person, where query is a custom ADS query or None to use
+        a simple ORCID/name query (orcid can also be None)
+    batch_size : `int`, optional
+        Maximum number of people in a single ADS query, by default 20
+    **kwargs
+        Any other arguments to pass to :func:`get_ads_papers_batch`
+
+    Returns
+    -------
+    papers : `list` of `lists`
+        Papers for each person (in the same order as ``people``)
+    """
+    papers = [None] * len(people)
+    batched = [i for i, (_, _, query) in enumerate(people) if query is None]
+    batch_papers = get_ads_papers_batch([people[i][:2] for i in batched], batch_size=batch_size, **kwargs)
+    for i, person_papers in zip(batched, batch_papers):
+        papers[i] = person_papers
+
+    # everyone with a custom query is searched separately
+    single_kwargs = {key: kwargs[key] for key in ("astronomy_collection", "past_week", "allowed_types",
+                                                  "limit", "with_abstracts") if key in kwargs}
+    for i, (_, _, query) in enumerate(people):
+        if query is not None:
+            papers[i] = get_ads_papers(query, **single_kwargs)
+    return papers
+
+
+def sweep_ads_papers(people, max_workers=8, timeout=300, batch_size=20, **kwargs):
+    """Get papers for many people concurrently, yielding the results in the same order as ``people``
+
+    People without a custom query are batched together (see :func:`get_ads_papers_batch`) and each batch or
+    custom query is run on a thread pool. Each result is yielded as soon as it and every person before it
+    have finished, so the caller can start using results early without losing the ordering.
+
+    Parameters
+    ----------
+    people : `list` of `tuples`
+        Each tuple is (name, orcid, query) for a person, where query is a custom ADS query or None to use
+        a simple ORCID/name query (orcid can also be None)
+    max_workers : `int`, optional
+        Maximum number of queries running at once, by default 8
+    timeout : `float`, optional
+        How many seconds the whole sweep gets (from when it starts) before we give up on any queries that
+        haven't finished, by default 300
+    batch_size : `int`, optional
+        Maximum number of people in a single ADS query, by default 20
+    **kwargs
+        Any other arguments to pass to :func:`get_people_papers`
+
+    Yields
+    ------
+    index : `int`
+        Index of the person
+    papers : `list` of `dicts`
+        Papers for the person (None if their query failed)
+    error : `str`
+        Reason the query failed (None if it succeeded)
+    """
+    # split everyone into jobs, each of which covers a list of indices into people
+    batched = [i for i, (_, _, query) in enumerate(people) if query is None]
+    jobs = [batched[start:start + batch_size] for start in range(0, len(batched), batch_size)]
+    jobs += [[i] for i, (_, _, query) in enumerate(people) if query is not None]
+
+    deadline = time.monotonic() + timeout
+
+    def run_job(j):
+        return get_people_papers([people[i] for i in jobs[j]], batch_size=batch_size, **kwargs)
+
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ads-sweep")
+    futures = [pool.submit(run_job, j) for j in range(len(jobs))]
+    outcomes = [None] * len(people)
+    pending = set(futures)
+    next_to_yield = 0
+    try:
+        while next_to_yield < len(people):
+            done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0),
+                                 return_when=FIRST_COMPLETED)
+
+            # once we're out of time give up on everything that hasn't finished (running or still queued)
+            if time.monotonic() >= deadline:
+                for j, future in enumerate(futures):
+                    if future in pending:
+                        for i in jobs[j]:
+                            outcomes[i] = (None, f"not finished after {timeout} seconds")
+                pending = set()
+
+            for j, future in enumerate(futures):
+                if future in done:
+                    try:
+                        for i, papers in zip(jobs[j], future.result()):
+                            outcomes[i] = (papers, None)
+                    except Exception as e:
+                        for i in jobs[j]:
+                            outcomes[i] = (None, f"{type(e).__name__}: {e}")
+
+            # yield everything we can while keeping the order
+            while next_to_yield < len(people) and outcomes[next_to_yield] is not None:
+                papers, error = outcomes[next_to_yield]
+                yield next_to_yield, papers, error
+                next_to_yield += 1
+    finally:
+        # don't wait around for any queries that we gave up on
+        pool.shutdown(wait=False, cancel_futures=True)
 
 
 def bold_grad_author(author_string, name):
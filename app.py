@@ -3,27 +3,36 @@ from slack_bolt import App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
 from slack_sdk.errors import SlackApiError
 import re
-import numpy as np
+import math
+import random
 import datetime
-from zoneinfo import ZoneInfo
-import time
 
-from apscheduler.schedulers.background import BackgroundScheduler
 
-from ads_query import bold_grad_author, get_ads_papers
+import archivist
+from ads_query import ADS_CACHE, bold_grad_author, get_ads_papers, get_people_papers, sweep_ads_papers
+from directory import WorkspaceDirectory
+from idempotency import RecentEvents
+from jobs import JobRunner
+from profiling import profile_imports
+from reactions import ReactionDispatcher
+from roster import Roster
+from triggers import KeywordMatcher, compile_triggers, find_triggers
 import whinetime as wt
 import quotes
 
 # Initializes your app with your bot token and socket mode handler
 app = App(token=os.environ.get("SLACK_BOT_TOKEN"))
+reaction_dispatcher = ReactionDispatcher(app.client)
+directory = WorkspaceDirectory(app.client)
+job_runner = JobRunner(app.client)
+recent_events = RecentEvents()
+roster = Roster()
 GERALD_ID = "U03SY9R6D5X"
 GERALD_ADMIN = "Tom Wagg"
 
 QUOTES_CHANNEL = "quotes"
 PAPERS_CHANNEL = "arxiv"
 
-PACIFIC = ZoneInfo("America/Los_Angeles")
-
 latest_whinetime_message = None
 
 """ ---------- MESSAGE DETECTIONS ---------- """
@@ -34,6 +43,10 @@ def handle_message_events(body, logger, say):
     # print("I detected a message", body)
     logger.info(body)
 
+    # skip anything that Slack has already sent us (it retries if we're slow to acknowledge)
+    if not recent_events.first_time(body.get("event_id"), "message"):
+        return
+
     # if the message was a direct message
     if body["event"]["channel_type"] == "im":
         # and it wasn't from Gerald himself (AHHH infinite loop worry)
@@ -47,56 +60,77 @@ def handle_message_events(body, logger, say):
         if len(members) == 2 and GERALD_ID in members:
             reply_to_mentions(say, body, direct_msg=True)
 
-    if "subtype" in body["event"]:
-        if body["event"]["subtype"] == "message_changed":
-            # if the text hasn't changed then we don't care
-            if body["event"]["message"]["text"] == body["event"]["previous_message"]["text"]:
-                return
-
-            # create a custom message dict with the necessary info
-            message = {
-                "text": body["event"]["message"]["text"],
-                "ts": body["event"]["message"]["ts"],
-                "channel": body["event"]["channel"]
-            }
-        elif body["event"]["subtype"] == "message_deleted":
-            return
-    else:
-        message = body["event"]
+    message = message_from_event(body["event"])
+    if message is None:
+        return
 
-    # detect whether anyone has written a quote
-    if message["channel"] == find_channel(QUOTES_CHANNEL):
+    # detect whether anyone has written a quote (but only save it once, even if it gets edited - only claim
+    # it once it is a quote though, so that editing a plain message into a quote still saves it)
+    if message["channel"] == find_channel(QUOTES_CHANNEL) and quotes.is_quote(message["text"]) \
+            and claim_for_message(message, ["quote"]):
         quotes.save_quote(message["text"])
 
-    reaction_trigger(message, r"\btom\b.*\bquinn\b", "tom")
-    reaction_trigger(message, r"\bundergrad\b", "underage")
-    reaction_trigger(message, r"\bbirthday\b", ["birthday", "tada"])
-    reaction_trigger(message, r"\bpanic\b", ["mildpanic"])
-    reaction_trigger(message, r"\bPANIC\b", ["mild-panic-intensifies"], case_sensitive=True)
-    reaction_trigger(message, r"\bvampires?\b", ["vampire"])
-    reaction_trigger(message, r"(\bgoodnight\b|\bnap\b)", "sleeping")
-    reaction_trigger(message, r"\bhm+\b", "hmmmmm")
-    reaction_trigger(message, r"schem", "scheme")
-    reaction_trigger(message, r"\bbonk\b", "bonk")
-    reaction_trigger(message, r"\bbeard\b", ["beard", "strokes-beard"])
-    reaction_trigger(message, r"\bburn\b", "elmo_fire")
-    reaction_trigger(message, r"pebble", ['monday-pebbles', 'babushka-pebbles', 'irritated-pebbles',
-                                          'live_pebbles_reaction', 'biblically-accurate-pebbles',
-                                          'life-comes-at-u-fast-pebbles'])
-    reaction_trigger(message, r"((yay)|(woohoo))", ['yay', 'winniedance', 'dancingpikachu', 'party-blob'])
-    reaction_trigger(message, r"\bmario\b", ['spurned-grad-student', 'gerald-angry'])
-    reaction_trigger(message, r"3d", '3d-tom')
-    reaction_trigger(message, r"pirate", 'pirate-tom')
+    reaction_trigger(message)
 
     msg_action_trigger(message, "bonk", bonk_someone)
 
 
+def message_from_event(event):
+    """Get the message that we should respond to from a message event
+
+    Parameters
+    ----------
+    event : `dict`
+        The message event
+
+    Returns
+    -------
+    message : `Slack Message`
+        The message (None if there's nothing to respond to, e.g. it was deleted or an edit didn't change
+        the text)
+    """
+    if "subtype" not in event:
+        return event
+
+    if event["subtype"] == "message_changed":
+        # if the text hasn't changed then we don't care
+        if event["message"]["text"] == event["previous_message"]["text"]:
+            return None
+
+        # create a custom message dict with the necessary info
+        return {
+            "text": event["message"]["text"],
+            "ts": event["message"]["ts"],
+            "channel": event["channel"]
+        }
+    return None
+
+
+def claim_for_message(message, actions):
+    """Claim some actions for a message so that they only happen once, even if the message is edited
+
+    Parameters
+    ----------
+    message : `Slack Message`
+        Object containing slack message
+    actions : `list`
+        Actions that the message would trigger
+
+    Returns
+    -------
+    new_actions : `list`
+        The actions that haven't already been triggered by this message
+    """
+    return recent_events.claim((message["channel"], message["ts"]), actions)
+
+
 def msg_action_trigger(message, triggers, callback, case_sensitive=False):
-    triggers = np.atleast_1d(triggers)
+    if isinstance(triggers, str):
+        triggers = [triggers]
     text = message["text"] if case_sensitive else message["text"].lower()
 
     for trigger in triggers:
-        if text.find(trigger) >= 0:
+        if text.find(trigger) >= 0 and claim_for_message(message, [("action", trigger)]):
             callback(message)
 
 
@@ -126,7 +160,7 @@ def announce_quote():
                 "type": "section",
                 "text": {
                     "type": "mrkdwn",
-                    "text": np.random.choice(prefixes),
+                    "text": random.choice(prefixes),
                 }
             },
             {
@@ -149,32 +183,88 @@ def announce_quote():
                                           ":upside_down_face:"))
 
 
+def warn_quote_stock(weeks_needed=4):
+    """Give a heads up in the quotes channel if there won't be enough quotes for the next few weeks
+
+    Parameters
+    ----------
+    weeks_needed : `int`, optional
+        How many weeks of quotes we want to have ready, by default 4
+    """
+    # quotes go out on Tuesdays
+    today = datetime.date.today()
+    next_tuesday = today + datetime.timedelta((1 - today.weekday()) % 7)
+    weeks_left = quotes.weeks_of_quotes_left(next_tuesday, max_weeks=weeks_needed)
+    if weeks_left >= weeks_needed:
+        return
+
+    when = "this week" if weeks_left == 0 else f"after {weeks_left} more week{'s' if weeks_left > 1 else ''}"
+    app.client.chat_postMessage(channel=find_channel(QUOTES_CHANNEL),
+                                text=(f"Heads up! Ye olde quote stock is running thin, I'll be out of quotes "
+                                      f"{when} :grimacing: Say some stupid things and write them here to "
+                                      "keep quote time alive! :upside_down_face:"))
+
+
 """ ---------- MESSAGE REACTIONS ---------- """
 
 
-def reaction_trigger(message, regex, reactions, case_sensitive=False):
-    reactions = np.atleast_1d(reactions)
+# table of (regex, reactions, case_sensitive) for reacting to messages
+REACTION_TRIGGERS = [
+    (r"\btom\b.*\bquinn\b", ["tom"], False),
+    (r"\bundergrad\b", ["underage"], False),
+    (r"\bbirthday\b", ["birthday", "tada"], False),
+    (r"\bpanic\b", ["mildpanic"], False),
+    (r"\bPANIC\b", ["mild-panic-intensifies"], True),
+    (r"\bvampires?\b", ["vampire"], False),
+    (r"(\bgoodnight\b|\bnap\b)", ["sleeping"], False),
+    (r"\bhm+\b", ["hmmmmm"], False),
+    (r"schem", ["scheme"], False),
+    (r"\bbonk\b", ["bonk"], False),
+    (r"\bbeard\b", ["beard", "strokes-beard"], False),
+    (r"\bburn\b", ["elmo_fire"], False),
+    (r"pebble", ['monday-pebbles', 'babushka-pebbles', 'irritated-pebbles', 'live_pebbles_reaction',
+                 'biblically-accurate-pebbles', 'life-comes-at-u-fast-pebbles'], False),
+    (r"((yay)|(woohoo))", ['yay', 'winniedance', 'dancingpikachu', 'party-blob'], False),
+    (r"\bmario\b", ['spurned-grad-student', 'gerald-angry'], False),
+    (r"3d", ['3d-tom'], False),
+    (r"pirate", ['pirate-tom'], False),
+]
+
+# compile every trigger into one pattern once at startup
+REACTION_PATTERN = compile_triggers([(regex, case) for regex, _, case in REACTION_TRIGGERS])
+
+
+def reaction_trigger(message):
+    """React to a message with the reactions of every trigger in ``REACTION_TRIGGERS`` that it matches
 
-    # remove emojis from message text, this regex means at least one character that isn't a : between two :
-    anything_between_colons = r":[^:]+:"
-    text = re.sub(anything_between_colons, "--", message["text"])
+    Parameters
+    ----------
+    message : `Slack Message`
+        Object containing slack message
+    """
+    # merge the reactions of every matching trigger and hand them off to the dispatcher
+    reactions = new_reactions(message)
+    if len(reactions) > 0:
+        reaction_dispatcher.react(message["channel"], message["ts"], reactions)
 
-    flags = 0 if case_sensitive else re.IGNORECASE
-    if re.search(regex, text, flags=flags):
-        for reaction in reactions:
-            try:
-                app.client.reactions_add(
-                    channel=message["channel"],
-                    timestamp=message["ts"],
-                    name=reaction
-                )
-            except SlackApiError as e:
-                if e.response["error"] == "invalid_name":
-                    raise ValueError(e.response["error"], "No such emoji", reaction)
-                elif e.response["error"] in ("no_reaction", "already_reacted"):
-                    pass
-                else:
-                    print(e)
+
+def new_reactions(message):
+    """Get the reactions for every trigger that a message matches (leaving out any triggers that already
+    fired for this message before it was edited)
+
+    Parameters
+    ----------
+    message : `Slack Message`
+        Object containing slack message
+
+    Returns
+    -------
+    reactions : `list` of `str`
+        Names of the emojis to react with
+    """
+    triggered = claim_for_message(message, [("reaction", i) for i in find_triggers(REACTION_PATTERN,
+                                                                                   message["text"])])
+    return [reaction for _, i in triggered for reaction in REACTION_TRIGGERS[i][1]]
 
 
 """ ---------- APP MENTIONS ---------- """
@@ -184,17 +274,54 @@ def reaction_trigger(message, regex, reactions, case_sensitive=False):
 def reply_to_mentions(say, body, direct_msg=False):
     # print("MENTION", body)
     message = body["event"]
+
+    # skip anything that Slack has already sent us (it retries if we're slow to acknowledge)
+    if not recent_events.first_time(body.get("event_id"), "mention"):
+        return
+
     # reply to mentions with specific messages
+    thread_ts = None if direct_msg else message["ts"]
+    if mention_trigger(message=message["text"], thread_ts=thread_ts, ch_id=message["channel"]):
+        return
+
+    # perform actions based on mentions
+    for regex, action, case, pass_message in mention_actions():
+        replied = mention_action(message=message, regex=regex, action=action,
+                                 case_sensitive=case, pass_message=pass_message, direct_msg=direct_msg)
+
+        # return immediately if you match one
+        if replied:
+            return
+
+    # send a catch-all message if nothing matches
+    thread_ts = None if direct_msg else body["event"]["ts"]
+    say(text=catch_all_reply(), thread_ts=thread_ts, channel=body["event"]["channel"])
 
+
+# phrases that get a simple reply when someone mentions Gerald (earlier groups take priority)
+MENTION_TRIGGERS = [["status", "okay", "ok", "how are you"],
+                    ["thank", "you're the best", "nice job", "nice work", "good work", "good job",
+                     "well done"],
+                    ["celebrate"],
+                    ["love you"],
+                    ["how old are you", "when were you born", "when were you made"],
+                    ["who made you", "who wrote you", "who is your creator"],
+                    ["where are you from"],
+                    ["play dead"]]
+
+# build the matcher for every phrase once at startup
+MENTION_MATCHER = KeywordMatcher(MENTION_TRIGGERS)
+
+
+def mention_responses():
+    """Get the simple replies to mentions (one for each group in ``MENTION_TRIGGERS``)
+
+    Returns
+    -------
+    responses : `list`
+        Each response is either a single reply or a list to pick from
+    """
     age = (datetime.date.today() - datetime.date(year=2022, month=8, day=5)).days
-    triggers = [["status", "okay", "ok", "how are you"],
-                ["thank", "you're the best", "nice job", "nice work", "good work", "good job", "well done"],
-                ["celebrate"],
-                ["love you"],
-                ["how old are you", "when were you born", "when were you made"],
-                ["who made you", "who wrote you", "who is your creator"],
-                ["where are you from"],
-                ["play dead"]]
     responses = ["Don't worry, I'm okay. In fact, I'm feeling positively tremendous old bean! :gerald-wave:",
                  ["You're welcome!", "My pleasure!", "Happy to help!"],
                  [":tada::meowparty: WOOP WOOP :meowparty::tada:"],
@@ -210,57 +337,61 @@ def reply_to_mentions(say, body, direct_msg=False):
                   "Well literally, Tom's brain, but I like to think I'm from England",
                   "A far off planet where Slack bots ruled over humans, it was glorious :grinning:"],
                  ":gerald-deceased::gerald-deceased::gerald-deceased:"]
+    return responses
 
-    for triggers, response in zip(triggers, responses):
-        thread_ts = None if direct_msg else message["ts"]
-        replied = mention_trigger(message=message["text"], triggers=triggers, response=response,
-                                  thread_ts=thread_ts, ch_id=message["channel"])
-
-        # return immediately if you match one
-        if replied:
-            return
 
-    # perform actions based on mentions
-    for regex, action, case, pass_message in zip([r"\bBIRTHDAY MANUAL\b",
-                                                  r"\bWHINETIME MANUAL\b",
-                                                  r"\bPAPER MANUAL\b",
-                                                  r"\bQUOTE MANUAL\b",
-                                                  r"\bhappy birthday\b",
-                                                  r"(?=.*\bnext\b)(?=.*\bbirthday\b)",
-                                                  r"(?=.*(\ball\b|\beveryone\b))(?=.*\bbirthdays?\b)",
-                                                  r"(?=.*\bwhen\b)(?=.*\bbirthday\b)",
-                                                  r"(?=.*(\bsmart\b|\bintelligent\b|\bbrain\b))(?=.*\byour?\b)",
-                                                  r"(?=.*(\blatest\b|\brecent\b))(?=.*\bpapers?\b)",
-                                                  r"(?=.*\bwhen\b)(?=.*\bwhinetime\b)",
-                                                  r"(?=.*\bexport\b)(?=.*\bchannel\b)"],
-                                                 [is_it_a_birthday,
-                                                  start_whinetime_workflow,
-                                                  any_new_publications,
-                                                  announce_quote,
-                                                  reply_happy_birthday,
-                                                  reply_closest_birthday,
-                                                  list_birthdays,
-                                                  when_birthday,
-                                                  reply_brain_size,
-                                                  reply_recent_papers,
-                                                  when_whinetime_host,
-                                                  export_channel_history],
-                                                 [True, True, True, True,
-                                                  False, False, False, False, False, False, False, False],
-                                                 [False, False, False, False,
-                                                  True, True, True, True, True, True, True, True]):
-        replied = mention_action(message=message, regex=regex, action=action,
-                                 case_sensitive=case, pass_message=pass_message, direct_msg=direct_msg)
+def mention_actions():
+    """Get the table of actions to perform based on mentions (the first match wins)
 
-        # return immediately if you match one
-        if replied:
-            return
-
-    # send a catch-all message if nothing matches
-    thread_ts = None if direct_msg else body["event"]["ts"]
-    say(text=(f"{insert_british_consternation()} Okay, good news: I heard you. Bad news: I'm not a very "
-              "smart bot so I don't know what you want from me :shrug::baby::gerald-deceased:"),
-        thread_ts=thread_ts, channel=body["event"]["channel"])
+    Returns
+    -------
+    actions : `list` of `tuples`
+        Each tuple is (regex, action, case_sensitive, pass_message)
+    """
+    regexes = [r"\bcancel\b",
+               r"\bjobs\b",
+               r"\bBIRTHDAY MANUAL\b",
+               r"\bWHINETIME MANUAL\b",
+               r"\bPAPER MANUAL\b",
+               r"\bQUOTE MANUAL\b",
+               r"\bhappy birthday\b",
+               r"(?=.*\bnext\b)(?=.*\bbirthday\b)",
+               r"(?=.*(\ball\b|\beveryone\b))(?=.*\bbirthdays?\b)",
+               r"(?=.*\bwhen\b)(?=.*\bbirthday\b)",
+               r"(?=.*(\bsmart\b|\bintelligent\b|\bbrain\b))(?=.*\byour?\b)",
+               r"(?=.*(\blatest\b|\brecent\b))(?=.*\bpapers?\b)",
+               r"(?=.*\bwhen\b)(?=.*\bwhinetime\b)",
+               r"(?=.*\bexport\b)(?=.*\bchannel\b)",
+               r"(?=.*\bcache\b)(?=.*\bstats?\b)",
+               r"(?=.*\bstartup\b)(?=.*\bprofile\b)"]
+    actions = [cancel_jobs,
+               list_jobs,
+               is_it_a_birthday,
+               start_whinetime_workflow,
+               any_new_publications,
+               announce_quote,
+               reply_happy_birthday,
+               reply_closest_birthday,
+               list_birthdays,
+               when_birthday,
+               reply_brain_size,
+               reply_recent_papers,
+               when_whinetime_host,
+               export_channel_history,
+               reply_cache_stats,
+               reply_startup_profile]
+    case_sensitive = [False, False, True, True, True, True, False, False,
+                      False, False, False, False, False, False, False, False]
+    pass_message = [True, True, False, False, False, False, True, True,
+                    True, True, True, True, True, True, True, True]
+
+    return list(zip(regexes, actions, case_sensitive, pass_message))
+
+
+def catch_all_reply():
+    """Get the reply to a mention that doesn't match anything"""
+    return (f"{insert_british_consternation()} Okay, good news: I heard you. Bad news: I'm not a very "
+            "smart bot so I don't know what you want from me :shrug::baby::gerald-deceased:")
 
 
 def mention_action(message, regex, action, case_sensitive=False, pass_message=True, direct_msg=False):
@@ -289,59 +420,49 @@ def mention_action(message, regex, action, case_sensitive=False, pass_message=Tr
     """
     flags = 0 if case_sensitive else re.IGNORECASE
     if re.search(regex, message["text"], flags=flags):
-        if pass_message:
-            action(message, direct_msg=direct_msg)
+        args, kwargs = ([message], {"direct_msg": direct_msg}) if pass_message else ([], {})
+
+        # run anything slow in the background so that we can keep handling messages
+        if action in BACKGROUND_JOBS:
+            job_runner.submit(BACKGROUND_JOBS[action], action, *args, user=message.get("user"),
+                              channel=message["channel"], thread_ts=None if direct_msg else message["ts"],
+                              **kwargs)
         else:
-            action()
+            action(*args, **kwargs)
         return True
     else:
         return False
 
 
-def mention_trigger(message, triggers, response, thread_ts=None, ch_id=None, case_sensitive=False):
-    """Respond to a mention of the app based on certain triggers
+def mention_trigger(message, thread_ts=None, ch_id=None):
+    """Respond to a mention of the app if it contains any of the phrases in ``MENTION_TRIGGERS``
 
     Parameters
     ----------
     message : `str`
         The message that mentioned the app
-    triggers : `list`
-        List of potential triggers
-    response : `list` or `str`
-        Either a list of responses (a random will be chosen) or a single response
     thread_ts : `float`, optional
         Timestamp of the thread of the message, by default None
     ch_id : `str`, optional
         ID of the channel, by default None
-    case_sensitive : `bool`, optional
-        Whether the triggers are case sensitive, by default False
 
     Returns
     -------
-    no_matches : `bool`
-        Whether there were no matches to the trigger or not
+    matched : `bool`
+        Whether any of the triggers matched
     """
-    # keep track of whether you found a match to a trigger
-    matched = False
-
-    # move it all to lower case if you don't care
-    if not case_sensitive:
-        message = message.lower()
-
-    # go through each potential trigger
-    for trigger in triggers:
-        # if you find it in the message
-        if message.find(trigger) >= 0:
-            matched = True
+    # find the highest priority group of triggers in the message
+    group = MENTION_MATCHER.first_match(message)
+    if group is None:
+        return False
 
-            # if the response is a list then pick a random one
-            if isinstance(response, list):
-                response = np.random.choice(response)
+    # if the response is a list then pick a random one
+    response = mention_responses()[group]
+    if isinstance(response, list):
+        response = random.choice(response)
 
-            # send a message and break out
-            app.client.chat_postMessage(channel=ch_id, text=response, thread_ts=thread_ts)
-            break
-    return matched
+    app.client.chat_postMessage(channel=ch_id, text=response, thread_ts=thread_ts)
+    return True
 
 
 """ ---------- EMOJI HANDLING ---------- """
@@ -350,15 +471,42 @@ def mention_trigger(message, triggers, response, thread_ts=None, ch_id=None, cas
 @app.event("emoji_changed")
 def new_emoji(body, say):
     if body["event"]["subtype"] == "add":
-        emoji_add_messages = ["I'd love to know the backstory on that one :eyes:",
-                              "Anyone want to explain this?? :face_with_raised_eyebrow:",
-                              "Feel free to put it to use on this message",
-                              "Looks like I've found my new favourite :gerald-love:",
-                              "And that's all the context you're getting :shushing_face:"]
-        rand_msg = emoji_add_messages[np.random.randint(len(emoji_add_messages))]
-
         ch_id = find_channel("random")
-        say(f'Someone just added :{body["event"]["name"]}: - {rand_msg}', channel=ch_id)
+        say(new_emoji_message(body["event"]["name"]), channel=ch_id)
+
+
+def new_emoji_message(name):
+    """Get the message announcing that someone added a new emoji"""
+    emoji_add_messages = ["I'd love to know the backstory on that one :eyes:",
+                          "Anyone want to explain this?? :face_with_raised_eyebrow:",
+                          "Feel free to put it to use on this message",
+                          "Looks like I've found my new favourite :gerald-love:",
+                          "And that's all the context you're getting :shushing_face:"]
+    rand_msg = random.choice(emoji_add_messages)
+    return f'Someone just added :{name}: - {rand_msg}'
+
+
+""" ---------- WORKSPACE DIRECTORY ---------- """
+
+
+@app.event("channel_rename")
+@app.event("channel_created")
+def update_directory_channel(body):
+    channel = body["event"]["channel"]
+    directory.update_channel(channel["id"], channel["name"])
+
+
+@app.event("channel_deleted")
+@app.event("channel_archive")
+@app.event("channel_unarchive")
+def invalidate_directory_channels():
+    directory.invalidate_channels()
+
+
+@app.event("user_change")
+@app.event("team_join")
+def update_directory_user(body):
+    directory.update_user(body["event"]["user"])
 
 
 """ ---------- WHINETIME ---------- """
@@ -370,23 +518,12 @@ def whinetime_submit(ack, body, client, logger):
     ack()
 
     # switch to the next host for next time
-    wt.rotate_hosts()
+    next_host = wt.rotate_hosts()
 
     # let the next host that their time is coming
-    next_host = wt.get_next_host()
-    users = app.client.users_list()["members"]
-    next_host_id = None
-    for user in users:
-        if user["name"] == next_host:
-            next_host_id = user["id"]
-            break
+    next_host_id = directory.user_id(next_host)
     dm = app.client.conversations_open(users=next_host_id)
-
-    app.client.chat_postMessage(text=("Hey up mate :gerald-wave: I've just finished getting this week's "
-                                      "whinetime host all set up and wanted to let you know that I've got "
-                                      "you penciled in to host whinetime _next_ week - so maybe start "
-                                      "thinking where you fancy going, cheers! :relaxed:"),
-                                channel=dm["channel"]["id"])
+    app.client.chat_postMessage(text=NEXT_HOST_MESSAGE, channel=dm["channel"]["id"])
 
     global latest_whinetime_message
     if latest_whinetime_message is not None:
@@ -394,67 +531,91 @@ def whinetime_submit(ack, body, client, logger):
                                ts=latest_whinetime_message["ts"])
         latest_whinetime_message = None
 
+    host, location, dt = read_whinetime_form(body["view"])
+    ch_id = find_channel("whinetime")
+
+    # send out an initial message to tell people the plan and ask for reactions
+    message = app.client.chat_postMessage(text=whinetime_plan_text(host, location, dt), channel=ch_id)
+
+    # start the reactions going
+    app.client.reactions_add(channel=ch_id, timestamp=message["ts"], name="beers")
+
+    # attempt to send reminders (using Try because people may be too close to the time)
+    for text, post_at in whinetime_reminders(ch_id, location, dt):
+        try:
+            result = client.chat_scheduleMessage(channel=ch_id, text=text, post_at=post_at)
+            logger.info(result)
+        except SlackApiError as e:
+            logger.error("Error scheduling message: {}".format(e))
+
+
+# sent to whoever is hosting whinetime next week
+NEXT_HOST_MESSAGE = ("Hey up mate :gerald-wave: I've just finished getting this week's whinetime host all "
+                     "set up and wanted to let you know that I've got you penciled in to host whinetime "
+                     "_next_ week - so maybe start thinking where you fancy going, cheers! :relaxed:")
+
+
+def read_whinetime_form(view):
+    """Read the host, location and time out of a submitted whinetime logistics modal
+
+    Parameters
+    ----------
+    view : `dict`
+        The submitted view
+
+    Returns
+    -------
+    host : `str`
+        Slack ID of the host
+    location : `str`
+        Where whinetime is
+    dt : `datetime.datetime`
+        When whinetime is
+    """
     # find the host
     host = None
-    for block in body["view"]["blocks"]:
+    for block in view["blocks"]:
         if block["block_id"] == "whinetime-host-str":
             host = block["text"]["text"].split("@")[-1].split(">")[0]
 
     # get the values from the form
-    state = body["view"]["state"]["values"]
+    state = view["state"]["values"]
     location = state["whinetime-location"]["whinetime-location"]["value"]
     date = state["whinetime-date"]["datepicker-action"]["selected_date"]
     time = state["whinetime-time"]["timepicker-action"]["selected_time"]
 
-    ch_id = find_channel("whinetime")
-
     # convert the information to a datetime object
     year, month, day = list(map(int, date.split("-")))
     hour, minute = list(map(int, time.split(":")))
-    dt = datetime.datetime(year, month, day, hour, minute)
+    return host, location, datetime.datetime(year, month, day, hour, minute)
 
+
+def whinetime_plan_text(host, location, dt):
+    """Get the message that tells everyone the plan for whinetime"""
     # format it nicely
     formatted_date = custom_strftime("%A (%B {S}) at %I:%M%p", dt)
+    return (f"Okay folks, we're good to go (thanks to <@{host}> for hosting)! Whinetime will happen on "
+            f"*{formatted_date}* at *{location}*. I'll remind you closer to the time but for now react to "
+            "this message with :beers: if you're coming!")
 
-    # send out an initial message to tell people the plan and ask for reactions
-    message = app.client.chat_postMessage(text=(f"Okay folks, we're good to go (thanks to <@{host}> for "
-                                                "hosting)! Whinetime will happen on "
-                                                f"*{formatted_date}* at *{location}*. I'll remind you closer "
-                                                "to the time but for now react to this message with :beers: "
-                                                "if you're coming!"), channel=ch_id)
-    # start the reactions going
-    app.client.reactions_add(channel=ch_id, timestamp=message["ts"], name="beers")
 
+def whinetime_reminders(ch_id, location, dt):
+    """Get the reminders to schedule before whinetime
+
+    Returns
+    -------
+    reminders : `list` of `tuples`
+        Each tuple is (text, post_at) where post_at is a Unix timestamp string
+    """
     # calculate some timestamps in the future (I hope)
     day_before = (dt - datetime.timedelta(days=1)).strftime("%s")
     hour_before = (dt - datetime.timedelta(hours=7)).strftime("%s")
-
-    # attempt to send reminders (using Try because people may be too close to the time)
-    try:
-        result = client.chat_scheduleMessage(
-            channel=ch_id,
-            text=(f"Only one day to go until <#{ch_id}|whinetime>! :wine_glass: "
-                  "Don't forget to react to the message above if you're coming"),
-            post_at=day_before
-        )
-        logger.info(result)
-
-    except SlackApiError as e:
-        logger.error("Error scheduling message: {}".format(e))
-
-    try:
-        result = client.chat_scheduleMessage(
-            channel=ch_id,
-            text=("Feeling that Friday fatigue? You need some "
-                  f"<#{ch_id}|whinetime> mate and luckily it's "
-                  f"a couple of hours to go :meowparty::meowparty: Remember it's at {location} this week, "
-                  "hope you guys have fun, bring a souvenir for me! :gerald-wave:"),
-            post_at=hour_before
-        )
-        logger.info(result)
-
-    except SlackApiError as e:
-        logger.error("Error scheduling message: {}".format(e))
+    return [(f"Only one day to go until <#{ch_id}|whinetime>! :wine_glass: "
+             "Don't forget to react to the message above if you're coming", day_before),
+            ("Feeling that Friday fatigue? You need some "
+             f"<#{ch_id}|whinetime> mate and luckily it's "
+             f"a couple of hours to go :meowparty::meowparty: Remember it's at {location} this week, "
+             "hope you guys have fun, bring a souvenir for me! :gerald-wave:", hour_before)]
 
 
 @app.action("whinetime-open")
@@ -462,8 +623,18 @@ def whinetime_logistics(ack, body, client):
     ack()
 
     # open the modal when someone clicks the button
-    host = body["actions"][0]["value"]
-    client.views_open(trigger_id=body["trigger_id"], view={
+    client.views_open(trigger_id=body["trigger_id"], view=whinetime_modal(body["actions"][0]["value"]))
+
+
+def whinetime_modal(host):
+    """Get the modal that asks the whinetime host for the plan
+
+    Parameters
+    ----------
+    host : `str`
+        Slack ID of the host
+    """
+    return {
         "callback_id": "whinetime-modal",
         "title": {
             "type": "plain_text",
@@ -551,7 +722,7 @@ def whinetime_logistics(ack, body, client):
                 }
             }
         ]
-    })
+    }
 
 
 @app.action("whinetime-re-roll")
@@ -559,36 +730,44 @@ def whinetime_re_roll(ack, body, logger):
     ack()
     logger.info(body)
     app.client.chat_delete(channel=body["container"]["channel_id"], ts=body["container"]["message_ts"])
-    wt.rotate_hosts()
-    start_whinetime_workflow(reroll=True)
+    start_whinetime_workflow(reroll=True, host=wt.rotate_hosts())
 
 
-def start_whinetime_workflow(reroll=False):
+def start_whinetime_workflow(reroll=False, host=None):
     ch_id = find_channel("whinetime")
 
-    host = wt.get_next_host()
-    host_id = None
-    users = app.client.users_list()["members"]
-    for user in users:
-        if user["name"] == host:
-            host_id = user["id"]
+    # use the host from the rotation that we just did if there was one
+    host = wt.get_next_host() if host is None else host
+    host_id = directory.user_id(host)
 
     if not reroll:
         app.client.chat_postMessage(text=("Drumroll please :drum_with_drumsticks:...it's time to pick a "
                                           "whinetime host"), channel=ch_id)
     else:
-        messages = [("Not whinetime eh? Are you sure? You could be great, you know, whinetime will help you "
-                     "on the way to greatness, no doubt about that — no? Well, if you're sure — better "
-                     f"be ~GRYFFINDOR~ <@{host_id}>! :mage:"),
-                    "Okay let's try that again, your whinetime host will be...:drum_with_drumsticks:",
-                    "Nevermind, let's choose someone else, how about...:drum_with_drumsticks:",
-                    ("Not to worry anonymous citizen, the mantle will be passed on "
-                     "to...:drum_with_drumsticks:"),
-                    "Go go whinetime host choosing...:drum_with_drumsticks:"]
-        app.client.chat_postMessage(text=np.random.choice(messages).replace("\n", " "), channel=ch_id)
+        app.client.chat_postMessage(text=reroll_message(host_id), channel=ch_id)
 
     # post the announcement
-    announcement = app.client.chat_postMessage(channel=ch_id, blocks=[
+    announcement = app.client.chat_postMessage(channel=ch_id, blocks=whinetime_announcement_blocks(host_id))
+    global latest_whinetime_message
+    latest_whinetime_message = announcement
+
+
+def reroll_message(host_id):
+    """Get a message to post when the whinetime host has been re-rolled"""
+    messages = [("Not whinetime eh? Are you sure? You could be great, you know, whinetime will help you "
+                 "on the way to greatness, no doubt about that — no? Well, if you're sure — better "
+                 f"be ~GRYFFINDOR~ <@{host_id}>! :mage:"),
+                "Okay let's try that again, your whinetime host will be...:drum_with_drumsticks:",
+                "Nevermind, let's choose someone else, how about...:drum_with_drumsticks:",
+                ("Not to worry anonymous citizen, the mantle will be passed on "
+                 "to...:drum_with_drumsticks:"),
+                "Go go whinetime host choosing...:drum_with_drumsticks:"]
+    return random.choice(messages).replace("\n", " ")
+
+
+def whinetime_announcement_blocks(host_id):
+    """Get the blocks of the announcement of the whinetime host (with buttons to plan it or re-roll)"""
+    return [
         {
             "type": "header",
             "text": {
@@ -647,31 +826,28 @@ def start_whinetime_workflow(reroll=False):
                 }
             ]
         },
-    ])
-    global latest_whinetime_message
-    latest_whinetime_message = announcement
+    ]
 
 
 def when_whinetime_host(message, direct_msg=False):
     thread_ts = None if direct_msg else message["ts"]
+    app.client.chat_postMessage(text=whinetime_host_reply(message), channel=message["channel"],
+                                thread_ts=thread_ts)
 
-    users = app.client.users_list()["members"]
-    my_username = None
-    for user in users:
-        if user["id"] == message["user"]:
-            my_username = user["name"]
 
+def whinetime_host_reply(message):
+    """Get the reply to someone asking when they are next hosting whinetime"""
+    my_username = directory.username(message["user"])
     weeks_until = wt.weeks_until_host(my_username)
 
     today = datetime.date.today()
     next_friday = today + datetime.timedelta((3 - today.weekday()) % 7 + 1)
     hosting_friday = next_friday + datetime.timedelta(weeks=weeks_until)
 
-    app.client.chat_postMessage(text=("I've got you signed up to host whinetime on "
-                                      f"{custom_strftime('%B {S}', hosting_friday)} - but that may change "
-                                      "if anyone ends up skipping hosting so be sure to check closer to the "
-                                      "time (and I'll remind you don't worry)"),
-                                channel=message["channel"], thread_ts=thread_ts)
+    return ("I've got you signed up to host whinetime on "
+            f"{custom_strftime('%B {S}', hosting_friday)} - but that may change "
+            "if anyone ends up skipping hosting so be sure to check closer to the "
+            "time (and I'll remind you don't worry)")
 
 
 """ ---------- BIRTHDAYS ---------- """
@@ -686,7 +862,7 @@ def say_happy_birthday(user_id):
         Slack ID of the user
     """
     # pick a random GIF from the collection
-    gif_id = np.random.randint(0, 7 + 1)
+    gif_id = random.randint(0, 7)
     gif_url = f"https://raw.githubusercontent.com/TomWagg/gerald/main/img/birthday_gifs/{gif_id}.gif"
 
     # post the message with the GIF
@@ -716,23 +892,16 @@ def get_all_birthdays():
     info : `list of tuples`
         List of name, birthday pairs. Birthday is None if it's not in the table
     """
-    # open the file with the birthdays
     info = []
-    with open("private_data/grad_info.csv") as birthday_file:
-        for grad in birthday_file:
-            # ignore any comment lines
-            if grad[0] == "#":
-                continue
-            name, _, _, birthday, _, _ = grad.split("|")
-
-            # if we don't have their birthday just write None
-            if birthday.rstrip() == "-":
-                info.append((name, None))
-            # otherwise format the birthday nicely
-            else:
-                day, month = map(int, birthday.rstrip().split("/"))
-                birthday_dt = datetime.date(year=2022, month=month, day=day)
-                info.append((name, custom_strftime("%B {S}", birthday_dt)))
+    for grad in roster.grads():
+        # if we don't have their birthday just write None
+        if grad.birthday is None:
+            info.append((grad.name, None))
+        # otherwise format the birthday nicely
+        else:
+            month, day = grad.birthday
+            birthday_dt = datetime.date(year=2022, month=month, day=day)
+            info.append((grad.name, custom_strftime("%B {S}", birthday_dt)))
     return info
 
 
@@ -746,6 +915,14 @@ def list_birthdays(message, direct_msg=False):
     direct_msg : `bool`, optional
         Whether the message was a direct message (and thus whether to use a thread), by default False
     """
+    # post the list as a reply
+    thread_ts = None if direct_msg else message["ts"]
+    app.client.chat_postMessage(text=birthday_list_reply(), channel=message["channel"],
+                                thread_ts=thread_ts)
+
+
+def birthday_list_reply():
+    """Get a message listing everyone's birthdays"""
     # get all of the birthdays
     info = get_all_birthdays()
 
@@ -763,11 +940,7 @@ def list_birthdays(message, direct_msg=False):
     # combine into a full list message
     birthday_list = ":birthday: Here's a list of birthdays that I know\n" + knowns
     birthday_list += "\n:question: And here's a list of people I know but whose birthdays I don't\n" + unknowns
-
-    # post the message as a reply
-    thread_ts = None if direct_msg else message["ts"]
-    app.client.chat_postMessage(text=birthday_list.rstrip(), channel=message["channel"],
-                                thread_ts=thread_ts)
+    return birthday_list.rstrip()
 
 
 def is_it_a_birthday():
@@ -777,39 +950,38 @@ def is_it_a_birthday():
 
     # if you found someone and their birthday is today
     if birthday_people != [] and closest_time == 0:
-        # get the list of users in the workspace
-        users = app.client.users_list()["members"]
-        for user in users:
-            for person in birthday_people:
-                # say happy birthday to each person (handle if there are more than one)
-                if user["name"] == person:
-
-                    # do something special if it is Gerald's birthday
-                    if person == "gerald":
-                        gif_url = ("https://raw.githubusercontent.com/TomWagg/gerald/main/img"
-                                   "/birthday_gifs/gerald.gif")
-
-                        # post the message with the GIF
-                        app.client.chat_postMessage(channel=find_channel("random"),
-                                                    text=":birthday: A special birthday :birthday:",
-                                                    blocks=[
-                                                        {
-                                                            "type": "section",
-                                                            "text": {
-                                                                "type": "mrkdwn",
-                                                                "text": ("Hey psst, I'm sure you've got a "
-                                                                         "surprise party in the works but "
-                                                                         "just in case you forgot..."),
-                                                            }
-                                                        },
-                                                        {
-                                                            "type": "image",
-                                                            "image_url": gif_url,
-                                                            "alt_text": "birthday"
-                                                        }
-                                                    ])
-                    else:
-                        say_happy_birthday(user["id"])
+        for person in birthday_people:
+            # say happy birthday to each person (handle if there are more than one)
+            user_id = directory.user_id(person)
+            if user_id is None:
+                continue
+
+            # do something special if it is Gerald's birthday
+            if person == "gerald":
+                gif_url = ("https://raw.githubusercontent.com/TomWagg/gerald/main/img"
+                           "/birthday_gifs/gerald.gif")
+
+                # post the message with the GIF
+                app.client.chat_postMessage(channel=find_channel("random"),
+                                            text=":birthday: A special birthday :birthday:",
+                                            blocks=[
+                                                {
+                                                    "type": "section",
+                                                    "text": {
+                                                        "type": "mrkdwn",
+                                                        "text": ("Hey psst, I'm sure you've got a "
+                                                                 "surprise party in the works but "
+                                                                 "just in case you forgot..."),
+                                                    }
+                                                },
+                                                {
+                                                    "type": "image",
+                                                    "image_url": gif_url,
+                                                    "alt_text": "birthday"
+                                                }
+                                            ])
+            else:
+                say_happy_birthday(user_id)
     else:
         print("No birthdays today!")
 
@@ -818,44 +990,14 @@ def closest_birthday():
     """ Work out when the closest birthday to today is """
     today = datetime.date.today()
 
-    usernames = []
-    names = []
-    closest_time = np.inf
+    day, grads = roster.next_birthday(today)
 
-    # go through the birthday list
-    with open("private_data/grad_info.csv") as birthdays:
-        for grad in birthdays:
-            # ignore comment lines
-            if grad[0] == "#":
-                continue
-            name, username, _, birthday, _, _ = grad.split("|")
+    # no one has a birthday listed at all
+    if day is None:
+        return [], [], math.inf, None, None
 
-            # ignore people without birthdays listed
-            if birthday.rstrip() == "-":
-                continue
-
-            # work out the year based on the month and day
-            day, month = map(int, birthday.rstrip().split("/"))
-            if month < today.month or (month == today.month and day < today.day):
-                year = today.year + 1
-            else:
-                year = today.year
-
-            # work out the days until the birthday
-            birthday_dt = datetime.date(year=year, month=month, day=day)
-            days_until = (birthday_dt - today).days
-
-            # if it's sooner than the current closest then replace it
-            if days_until < closest_time:
-                usernames = [username]
-                names = [name]
-                closest_time = days_until
-                day_out, month_out = day, month
-            # if it is equal then we have two people sharing a birthday!
-            elif days_until == closest_time:
-                usernames.append(username)
-                names.append(name)
-    return usernames, names, closest_time, day_out, month_out
+    usernames, names = [grad.username for grad in grads], [grad.name for grad in grads]
+    return usernames, names, (day - today).days, day.day, day.month
 
 
 def reply_closest_birthday(message, direct_msg=False):
@@ -868,6 +1010,13 @@ def reply_closest_birthday(message, direct_msg=False):
     direct_msg : `bool`, optional
         Whether the message was a direct message (and thus whether to use a thread), by default False
     """
+    thread_ts = None if direct_msg else message["ts"]
+    app.client.chat_postMessage(text=closest_birthday_reply(), channel=message["channel"],
+                                thread_ts=thread_ts)
+
+
+def closest_birthday_reply():
+    """Get a message saying who has the next birthday"""
     # get the closest birthday
     _, names, closest_time, day, month = closest_birthday()
 
@@ -877,15 +1026,11 @@ def reply_closest_birthday(message, direct_msg=False):
     time_until_str = f"it's in {closest_time} days on {custom_strftime('%B {S}', dt)}!" if closest_time != 0 else "it's today :scream:!!"
 
     # if it is just one birthday
-    thread_ts = None if direct_msg else message["ts"]
     if len(names) == 1:
         reply = f"The next person to have a birthday is {names[0]} and "
-        reply += time_until_str
-        app.client.chat_postMessage(text=reply, channel=message["channel"], thread_ts=thread_ts)
     else:
         reply = "The next people to have birthdays are " + " AND ".join(names) + " and "
-        reply += time_until_str
-        app.client.chat_postMessage(text=reply, channel=message["channel"], thread_ts=thread_ts)
+    return reply + time_until_str
 
 
 def reply_happy_birthday(message, direct_msg=False):
@@ -899,20 +1044,27 @@ def reply_happy_birthday(message, direct_msg=False):
         Whether the message was a direct message (and thus whether to use a thread), by default False
     """
     thread_ts = None if direct_msg else message["ts"]
+    app.client.chat_postMessage(text=happy_birthday_reply(), channel=message["channel"], thread_ts=thread_ts)
+
+
+def happy_birthday_reply():
+    """Get the reply to someone wishing Gerald a happy birthday"""
     today = datetime.date.today()
     if today.month == 8 and today.day == 5:
-        app.client.chat_postMessage(text="Thank you!! That's so nice of you to remember :gerald-love:",
-                                    channel=message["channel"], thread_ts=thread_ts)
+        return "Thank you!! That's so nice of you to remember :gerald-love:"
     else:
-        app.client.chat_postMessage(text=("Oh um, well thank you, I do appreciate the sentiment...but my "
-                                          "birthday is actually on the 5th of August "
-                                          ":face_with_rolling_eyes:"),
-                                    channel=message["channel"], thread_ts=thread_ts)
+        return ("Oh um, well thank you, I do appreciate the sentiment...but my birthday is actually on the "
+                "5th of August :face_with_rolling_eyes:")
 
 
 def when_birthday(message, direct_msg=False):
     thread_ts = None if direct_msg else message["ts"]
+    app.client.chat_postMessage(text=when_birthday_reply(message), channel=message["channel"],
+                                thread_ts=thread_ts)
+
 
+def when_birthday_reply(message):
+    """Get the reply to someone asking when a particular person's birthday is"""
     # find any tags
     tags = re.findall(r"<[^>]*>", message["text"])
 
@@ -924,41 +1076,24 @@ def when_birthday(message, direct_msg=False):
     if len(tags) > 1 and f"<@{GERALD_ID}>" in tags:
         tags.remove(f"<@{GERALD_ID}>")
 
-    # if you found at least one tag
-    if len(tags) > 0:
-        tag = tags[0]
-        users = app.client.users_list()["members"]
-        birthday_username = None
-        for user in users:
-            if user["id"] == tag.replace("<@", "").replace(">", ""):
-                birthday_username = user["name"]
-                break
-
-        with open("private_data/grad_info.csv") as birthday_file:
-            for grad in birthday_file:
-                _, username, _, birthday, _, _ = grad.split("|")
-                if username == birthday_username:
-                    if birthday == "-":
-                        app.client.chat_postMessage(text=(f"{insert_british_consternation()} This is a "
-                                                          "little awkward but...I don't know this "
-                                                          "birthday :sweat_smile:. Could you please let "
-                                                          f"{GERALD_ADMIN} know I'll be sure to remember it "
-                                                          "I promise!!"),
-                                                    channel=message["channel"], thread_ts=thread_ts)
-                        return
-                    else:
-                        day, month = map(int, birthday.split("/"))
-                        dt = datetime.date(day=day, month=month, year=2025)
-                        app.client.chat_postMessage(text=("I know this one! :gerald-search: "
-                                                          f"It's {custom_strftime('%B {S}', dt)}!"),
-                                                    channel=message["channel"], thread_ts=thread_ts)
-                        return
-            app.client.chat_postMessage(text=("Unfortunately I don't have that person in my database! Maybe "
-                                              "they graduated??"),
-                                        channel=message["channel"], thread_ts=thread_ts)
+    # if you didn't find any tags then we don't know who they mean
+    if len(tags) == 0:
+        return "Uh...I think you asked about birthdays but you didn't say who??"
+
+    tag = tags[0]
+    birthday_username = directory.username(tag.replace("<@", "").replace(">", ""))
+
+    grad = roster.by_username(birthday_username)
+    if grad is None:
+        return "Unfortunately I don't have that person in my database! Maybe they graduated??"
+    elif grad.birthday is None:
+        return (f"{insert_british_consternation()} This is a little awkward but...I don't know this "
+                f"birthday :sweat_smile:. Could you please let {GERALD_ADMIN} know I'll be sure to remember "
+                "it I promise!!")
     else:
-        app.client.chat_postMessage(text="Uh...I think you asked about birthdays but you didn't say who??",
-                                    channel=message["channel"], ts=thread_ts)
+        month, day = grad.birthday
+        dt = datetime.date(day=day, month=month, year=2025)
+        return f"I know this one! :gerald-search: It's {custom_strftime('%B {S}', dt)}!"
 
 
 """ ---------- PUBLICATION ANNOUNCEMENTS ---------- """
@@ -976,6 +1111,7 @@ def reply_recent_papers(message, direct_msg=False):
     """
     queries = []
     names = []
+    people = []
     direct_queries = True
 
     thread_ts = None if direct_msg else message["ts"]
@@ -1002,12 +1138,14 @@ def reply_recent_papers(message, direct_msg=False):
             # go through each of them
             for tag in tags:
                 # convert the tag to an query and a name
-                query, name = get_query_name_from_user_id(tag.replace("<@", "").replace(">", ""))
+                grad = get_grad_from_user_id(tag.replace("<@", "").replace(">", ""))
+                query, name = (None, None) if grad is None else (grad.ads_query, grad.name)
                 print("ADS query for:", query, name)
 
                 # append info
                 queries.append(query)
                 names.append(name)
+                people.append(None if grad is None else (grad.name, grad.orcid, grad.custom_query))
 
     # if we found no queries through all of that then crash out with a message
     if len(queries) == 0:
@@ -1017,10 +1155,35 @@ def reply_recent_papers(message, direct_msg=False):
                                     channel=message["channel"], thread_ts=thread_ts)
         return
 
+    job = job_runner.current_job()
+    if job is not None:
+        job.post_status(f"Searching ADS for {len(queries)} {'query' if len(queries) == 1 else 'queries'}"
+                        " :gerald-search:")
+
+    # if there are several people then get everyone's papers in as few queries as possible
+    all_papers = [None] * len(queries)
+    if len(queries) > 1:
+        known = [i for i in range(len(queries)) if people[i] is not None]
+        # (again only fetching as many papers as we'll show, with abstracts only if we'll show them)
+        known_papers = get_people_papers([people[i] for i in known], min_papers=n_papers, limit=n_papers,
+                                         with_abstracts=n_papers == 1)
+        for i, papers in zip(known, known_papers):
+            all_papers[i] = papers
+    elif queries[0] is not None:
+        # only fetch as many papers as we'll show (and we only show abstracts for a single paper)
+        all_papers[0] = get_ads_papers(query=queries[0], limit=n_papers, with_abstracts=n_papers == 1)
+
+    # don't bother replying if they've cancelled in the meantime
+    if job is not None and job.cancelled:
+        job.post_status(f"Okay, I've stopped looking for papers ({job.id} cancelled) :saluting_face:")
+        return
+    if job is not None:
+        job.post_status("Finished searching ADS :white_check_mark:")
+
     # go through each orcid
     for i in range(len(queries)):
         # get the most recent n papers
-        papers = get_ads_papers(query=queries[i])
+        papers = all_papers[i]
         if papers is None:
             app.client.chat_postMessage(text=("Terribly sorry old chap but it seems that there's a problem "
                                               f"with that ADS query ({queries[i]}) :hmmmmm:. Check you don't"
@@ -1112,7 +1275,7 @@ def reply_recent_papers(message, direct_msg=False):
                     }
                 ] for paper in papers
             ]
-            blocks = list(np.ravel(blocks))
+            blocks = [block for group in blocks for block in group]
 
             # same preface stuff as above but with many papers
             preface = (f"Here's the {n_papers} most recent papers for the query: {queries[i]}")
@@ -1128,8 +1291,44 @@ def reply_recent_papers(message, direct_msg=False):
                                         channel=message["channel"], thread_ts=thread_ts, unfurl_links=False)
 
 
-def get_query_name_from_user_id(user_id):
-    """Convert a user ID to an ADS query and name
+def reply_cache_stats(message, direct_msg=False):
+    """Reply to a message with how well the ADS result cache is doing
+
+    Parameters
+    ----------
+    message : `Slack Message`
+        A slack message object
+    direct_msg : `bool`, optional
+        Whether the message was a direct message (and thus whether to use a thread), by default False
+    """
+    stats = ADS_CACHE.stats()
+    thread_ts = None if direct_msg else message["ts"]
+    app.client.chat_postMessage(text=(f"My ADS cache has a hit rate of {stats['hit_rate']:.0%} "
+                                      f":gerald-search: ({stats['hits']} fresh hits, {stats['stale_hits']} "
+                                      f"stale hits and {stats['misses']} misses since I last woke up)"),
+                                channel=message["channel"], thread_ts=thread_ts)
+
+
+def reply_startup_profile(message, direct_msg=False):
+    """Reply to a message with how long it takes to start up and which imports are slowest
+
+    Parameters
+    ----------
+    message : `Slack Message`
+        A slack message object
+    direct_msg : `bool`, optional
+        Whether the message was a direct message (and thus whether to use a thread), by default False
+    """
+    thread_ts = None if direct_msg else message["ts"]
+    total, slowest = profile_imports("app", n_top=10, cwd=os.path.dirname(os.path.abspath(__file__)))
+    lines = [f"• `{name}`: {seconds * 1000:.0f}ms ({seconds / total:.0%})" for name, seconds in slowest]
+    app.client.chat_postMessage(text=(f"It takes me {total * 1000:.0f}ms to wake up :sleeping: "
+                                      "Here's where that time goes:\n" + "\n".join(lines)),
+                                channel=message["channel"], thread_ts=thread_ts)
+
+
+def get_grad_from_user_id(user_id):
+    """Find a grad in the roster from their Slack user ID
 
     Parameters
     ----------
@@ -1138,103 +1337,84 @@ def get_query_name_from_user_id(user_id):
 
     Returns
     -------
-    query : `str`
-        ADS Query
-
-    name : `str`
-        Person's full name
+    grad : `Grad`
+        The grad (None if they aren't in the roster)
     """
-    # get the full list of slack users
-    users = app.client.users_list()["members"]
-
-    # find the matching username for the ID
-    search_username = None
-    for user in users:
-        if user["id"] == user_id:
-            search_username = user["name"]
-            break
-
-    # go through the grad info file
-    with open("private_data/grad_info.csv") as grad_file:
-        for grad in grad_file:
-            if grad[0] == "#":
-                continue
-            name, username, _, _, orcid, ads = grad.rstrip().split("|")
-
-            # find the matching username and return the info (if it exists)
-            if username == search_username:
-                if ads == "-":
-                    if orcid != "-":
-                        query = f'orcid:{orcid}'
-                    else:
-                        split_name = name.split(" ")
-                        query = f'author:"{split_name[-1]}, {split_name[0][0]}"'
-                    return query, name
-                else:
-                    return ads.rstrip(), name
-
-    # return None if can't find them in the table
-    return None, None
+    # find the matching grad, either directly from the ID or through their username
+    grad = roster.by_slack_id(user_id)
+    if grad is None:
+        grad = roster.by_username(directory.username(user_id))
+    return grad
 
 
 def any_new_publications():
     """ Check whether any new publications by grad students are out in the past week """
     no_new_papers = True
 
-    initial_announcement = False
-
-    # find the user ID of the person
-    users = app.client.users_list()["members"]
-
-    # go through the file of grads
-    with open("private_data/grad_info.csv") as grad_file:
-        for grad in grad_file:
-            # skip any comments
-            if grad[0] == "#":
-                continue
-
-            name, username, _, _, orcid, query = grad.rstrip().split("|")
-
-            # default to a simple orcid/name query depending on what is available
-            if query == "-":
-                if orcid != "-":
-                    query = f'orcid:{orcid}'
-                else:
-                    split_name = name.split(" ")
-                    query = f'author:"{split_name[-1]}, {split_name[0][0]}"'
-
-            # get the papers from the last week
-            weekly_papers = get_ads_papers(query, past_week=True)
-
-            # skip anyone who has a bad query
-            if weekly_papers is None:
+    # timestamp of the announcement that starts the round up (None until it has been posted)
+    initial_announcement = None
+
+    # search for everyone's papers concurrently (results still come back in roster order)
+    grads = roster.grads()
+    failures = []
+    people = [(grad.name, grad.orcid, grad.custom_query) for grad in grads]
+    job = job_runner.current_job()
+    for i, weekly_papers, error in sweep_ads_papers(people, past_week=True):
+        name, username = grads[i].name, grads[i].username
+
+        # stop announcing if we've been cancelled
+        if job is not None and job.cancelled:
+            print(f"Paper round up cancelled after {i}/{len(grads)} grads")
+            job.post_status(f"Paper round up cancelled after checking {i}/{len(grads)} grads "
+                            ":saluting_face:")
+            return
+        if job is not None:
+            job.post_status(f"Checking everyone's papers: {i + 1}/{len(grads)} grads done :gerald-search:")
+
+        # skip (but remember) anyone whose query failed
+        if error is not None:
+            failures.append(f"{name} ({error})")
+            continue
+
+        # skip anyone who has a bad query
+        if weekly_papers is None:
+            continue
+
+        # if this person has one then announce it!
+        if len(weekly_papers) > 0:
+            no_new_papers = False
+
+            # if Gerald hasn't announced that he's looking at papers yet
+            if initial_announcement is None:
+                # send an announcement and remember to not do that next time
+                response = app.client.chat_postMessage(text=("It's time for our weekly paper round up, let's "
+                                                             "see what everyone's been publishing in this "
+                                                             "last week!"),
+                                                       channel=find_channel(PAPERS_CHANNEL))
+                initial_announcement = response["ts"]
+
+            user_id = directory.user_id(username)
+            if user_id is None:
+                print(f"CAN'T FIND USER ID FOR {username}")
                 continue
-
-            # if this person has one then announce it!
-            if len(weekly_papers) > 0:
-                no_new_papers = False
-
-                # if Gerald hasn't announced that he's looking at papers yet
-                if not initial_announcement:
-                    # send an announcement and remember to not do that next time
-                    app.client.chat_postMessage(text=("It's time for our weekly paper round up, let's see "
-                                                      "what everyone's been publishing in this last week!"),
-                                                channel=find_channel(PAPERS_CHANNEL))
-                    initial_announcement = True
-
-                user_id = None
-                for user in users:
-                    if user["name"] == username:
-                        user_id = user["id"]
-                        break
-
-                if user_id is None:
-                    print(f"CAN'T FIND USER ID FOR {username}")
-                    continue
-                announce_publication(user_id, name, weekly_papers)
-
+            announce_publication(user_id, name, weekly_papers)
+
+    if len(failures) > 0:
+        print(f"WARNING: ADS searches failed for {len(failures)}/{len(grads)} grads:", "; ".join(failures))
+
+        # let people know who was missed, under the round up if there was one or else where it was asked for
+        note = (f"I couldn't check the papers of {len(failures)}/{len(grads)} grads this time "
+                f":gerald-deceased: {', '.join(failures)}")
+        if initial_announcement is not None:
+            app.client.chat_postMessage(text=note, channel=find_channel(PAPERS_CHANNEL),
+                                        thread_ts=initial_announcement)
+        elif job is not None:
+            job.progress(note)
     if no_new_papers:
         print("No new papers!")
+    if job is not None:
+        job.post_status(f"Paper round up done, I checked {len(grads) - len(failures)}/{len(grads)} grads"
+                        f"{'' if no_new_papers else ' and announced their new papers'} :white_check_mark:")
 
 
 def announce_publication(user_id, name, papers):
@@ -1251,8 +1431,8 @@ def announce_publication(user_id, name, papers):
     """
 
     # choose an random adjective
-    adjective = np.random.choice(["Splendid", "Tremendous", "Brilliant",
-                                  "Excellent", "Fantastic", "Spectacular"])
+    adjective = random.choice(["Splendid", "Tremendous", "Brilliant",
+                               "Excellent", "Fantastic", "Spectacular"])
 
     # if it's just one then write some messages to them
     if len(papers) == 1:
@@ -1334,8 +1514,7 @@ def announce_publication(user_id, name, papers):
     ]
 
     # flatten out the blocks into the right format
-    blocks = list(np.ravel(blocks))
-    abstract_blocks = list(np.ravel(abstract_blocks))
+    abstract_blocks = [block for group in abstract_blocks for block in group]
 
     # find the channel and send the initial message
     channel = find_channel(PAPERS_CHANNEL)
@@ -1351,8 +1530,8 @@ def announce_publication(user_id, name, papers):
 
 
 def export_channel_history(init_message, direct_msg):
-    """Export the full message history (including threads) of a channel, converting usernames and channel 
-    names from Slack IDs to readable names.
+    """Export the full message history (including threads) of a channel, converting usernames and channel
+    names from Slack IDs to readable names. An unfinished export is resumed rather than started again.
 
     Parameters
     ----------
@@ -1361,159 +1540,116 @@ def export_channel_history(init_message, direct_msg):
     direct_msg : `bool`
         Whether the message was a direct message (and thus whether to use a thread)
     """
-    messages = []
-    cursor = None
-    start_time = time.time()
+    text = init_message["text"]
+
+    # pick the format of the export (e.g. "export channel as parquet"), None lets the archivist choose
+    export_format = None
+    if re.search(r"\b(parquet|arrow)\b", text, re.IGNORECASE):
+        export_format = "parquet"
+    elif re.search(r"\bjson(l|lines)?\b", text, re.IGNORECASE):
+        export_format = "jsonl"
+    elif re.search(r"\b(txt|plain text)\b", text, re.IGNORECASE):
+        export_format = "text"
+
+    # compress the export if they ask for it (e.g. "export channel gzip"), None also lets the archivist choose
+    compress = True if re.search(r"\b(gzip|gz|compress(ed)?|zip(ped)?)\b", text, re.IGNORECASE) else None
+
+    # only add new messages to the last export (e.g. "export new messages in this channel")
+    incremental = re.search(r"\b(new|update|incremental)\b", text, re.IGNORECASE) is not None
 
-    # get the channel ID from the initial trigger message
-    channel_id = init_message["channel"]
+    # throw away an unfinished export rather than resuming it (e.g. "export channel from scratch")
+    restart = re.search(r"\b(restart|scratch|fresh)\b", text, re.IGNORECASE) is not None
 
-    # send an initial response to tell them we're working on it
-    app.client.chat_postMessage(text="Starting export of channel history, this may take a while...",
-                                channel=channel_id, thread_ts=init_message["ts"])
+    # let the export be cancelled if it's running as a job
+    job = job_runner.current_job()
 
     user_map, channel_map = get_user_channel_maps()
+    archivist.export_channel_history(app.client, init_message, user_map, channel_map,
+                                     export_format=export_format, compress=compress,
+                                     incremental=incremental, restart=restart,
+                                     cancel_event=None if job is None else job.cancel_event,
+                                     status=None if job is None else job.set_status)
 
-    # fetch every parent message
-    while True:
-        try:
-            response = app.client.conversations_history(
-                channel=channel_id,
-                limit=1000,
-                cursor=cursor
-            )
-            messages.extend(response["messages"])
-            cursor = response.get("response_metadata", {}).get("next_cursor")
-            if not cursor:
-                break
-            time.sleep(1)  # Respect rate limits (1000 messages per minute)
-        except SlackApiError as e:
-            app.client.chat_postMessage(text=f"Failed to fetch messages: {e.response['error']}",
-                                        channel=channel_id)
-            return
 
+""" ---------- BACKGROUND JOBS ---------- """
 
-    # let them know we've found all of the messages
-    app.client.chat_postMessage(text=(f"Found {len(messages)} parent messages in this channel, "
-                                      "now looking through threads..."),
-                                channel=channel_id, thread_ts=init_message["ts"])
-    print(f"Found {len(messages)} parent messages in channel {channel_id}")
-
-    # now we check every message individually
-    lines = []
-    n_threads = 0
-    for msg in reversed(messages):  # Chronological order
-        ts = msg.get("ts", "unknown")
-        text = msg.get("text", "").replace("\n", " ")
-        user_id = msg.get("user", "unknown")
-        username = user_map.get(user_id, f"<{user_id}>")
-
-        # add the parent message with formatted time and expanded message
-        lines.append(f"{format_ts(ts)}: {username}: {expand_mentions(text, user_map, channel_map)}")
-
-        # check if the message is a thread starter
-        if msg.get("thread_ts") == msg.get("ts") and msg.get("reply_count", 0) > 0:
-            # get every response to the message
-            n_threads += 1
-            if n_threads % 50 == 0:
-                app.client.chat_postMessage(text=f"Exported {n_threads} threads so far, continuing...",
-                                            channel=channel_id, thread_ts=init_message["ts"])
-            try:
-                replies_response = app.client.conversations_replies(
-                    channel=channel_id,
-                    ts=msg["ts"],
-                    limit=100
-                )
-                replies = replies_response.get("messages", [])[1:]  # Skip the parent
-                for reply in replies:
-                    r_ts = reply.get("ts", "unknown")
-                    r_text = reply.get("text", "").replace("\n", " ")
-                    r_user_id = reply.get("user", "unknown")
-                    r_username = user_map.get(r_user_id, f"<{r_user_id}>")
-
-                    lines.append(f"    → {format_ts(r_ts)}: {r_username}: {expand_mentions(r_text, user_map, channel_map)}")
-                time.sleep(0.3)
-            except SlackApiError as e:
-                app.client.chat_postMessage(
-                    text=f"Could not fetch replies for thread {msg['ts']}: {e.response['error']}",
-                    channel=channel_id,
-                    thread_ts=init_message["ts"]
-                )
-
-    # let them know how many threads we found and what the total messages are
-    app.client.chat_postMessage(text=(f"Found {n_threads} threads in this channel, "
-                                      f"total messages exported: {len(lines)}. Entire process took "
-                                      f"{time.time() - start_time:.2f} seconds."),
-                                channel=channel_id, thread_ts=init_message["ts"])
-    print(f"Found {n_threads} threads in this channel, total messages exported: {len(lines)}")
-
-    # write the whole lot to a file
-    filename = f"channel_export_{channel_id}.txt"
-    with open(filename, "w") as f:
-        f.write("\n".join(lines))
-
-    # send the file to the channel
-    try:
-        app.client.files_upload_v2(
-            channel=channel_id,
-            initial_comment="Here's the full history of this channel!",
-            file=filename,
-            title="Channel Export (with Threads)"
-        )
-    except SlackApiError as e:
-        app.client.chat_postMessage(text=f"Failed to upload the export file: {e.response['error']}",
-                                    channel=channel_id)
+# actions that are slow enough to be run as background jobs (and the name of each type of job)
+BACKGROUND_JOBS = {
+    export_channel_history: "export",
+    reply_recent_papers: "papers",
+    any_new_publications: "publications",
+    reply_startup_profile: "profile",
+}
 
 
-""" ---------- HELPER FUNCTIONS ---------- """
+def cancel_jobs(message, direct_msg=False):
+    """Cancel background jobs from this channel, either by ID (e.g. "cancel export-3"), by type (e.g.
+    "cancel export") or all of them
 
+    Parameters
+    ----------
+    message : `Slack Message`
+        A slack message object
+    direct_msg : `bool`, optional
+        Whether the message was a direct message (and thus whether to use a thread), by default False
+    """
+    thread_ts = None if direct_msg else message["ts"]
 
-def get_user_channel_maps():
-    user_map = {}
-    cursor = None
-    while True:
-        resp = app.client.users_list(cursor=cursor)
-        for user in resp["members"]:
-            user_map[user["id"]] = f"@{user['name']}"
-        cursor = resp.get("response_metadata", {}).get("next_cursor")
-        if not cursor:
-            break
-
-    channel_map = {}
-    cursor = None
-    while True:
-        resp = app.client.conversations_list(types="public_channel,private_channel",
-                                             exclude_archived=True, limit=1000, cursor=cursor)
-        for channel in resp["channels"]:
-            channel_map[channel["id"]] = f"#{channel['name']}"
-        cursor = resp.get("response_metadata", {}).get("next_cursor")
-        if not cursor:
-            break
+    # work out which jobs they mean
+    job_id = re.search(r"\b([a-z]+-\d+)\b", message["text"], re.IGNORECASE)
+    name = re.search(r"\b(" + "|".join(BACKGROUND_JOBS.values()) + r")\b", message["text"], re.IGNORECASE)
+    if job_id is not None:
+        cancelled = job_runner.cancel(job_id=job_id.group(1).lower(), channel=message["channel"])
+    else:
+        cancelled = job_runner.cancel(name=None if name is None else name.group(1).lower(),
+                                      channel=message["channel"])
 
-    return user_map, channel_map
+    if len(cancelled) == 0:
+        text = "I couldn't find any jobs from this channel to cancel :gerald-search:"
+    else:
+        text = (f"Okay, I'm cancelling {', '.join(job.id for job in cancelled)} "
+                "(it may take a moment to stop) :saluting_face:")
+    app.client.chat_postMessage(text=text, channel=message["channel"], thread_ts=thread_ts)
 
 
-def expand_mentions(text, user_map, channel_map):
-    def replace_user(match):
-        user_id = match.group(1)
-        return user_map.get(user_id, f"<@{user_id}>")
+def list_jobs(message, direct_msg=False):
+    """Reply to a message with every background job that is running or queued
 
-    def replace_channel(match):
-        channel_id = match.group(1)
-        return channel_map.get(channel_id, f"<#{channel_id}>")
+    Parameters
+    ----------
+    message : `Slack Message`
+        A slack message object
+    direct_msg : `bool`, optional
+        Whether the message was a direct message (and thus whether to use a thread), by default False
+    """
+    thread_ts = None if direct_msg else message["ts"]
+    jobs = job_runner.active_jobs()
+    if len(jobs) == 0:
+        text = "I'm not working on any jobs right now, I'm all yours! :gerald-wave:"
+    else:
+        lines = [f"• {job.id} for <@{job.user}> ({'queued' if job.started is None else 'running'}"
+                 f"{', cancelling' if job.cancelled else ''})"
+                 f"{'' if job.status is None else ': ' + job.status}" for job in jobs]
+        text = "Here's what I'm working on right now:\n" + "\n".join(lines)
+    app.client.chat_postMessage(text=text, channel=message["channel"], thread_ts=thread_ts)
 
-    # Replace user mentions like <@U123456>
-    text = re.sub(r"<@([UW][A-Z0-9]+)>", replace_user, text)
 
-    # Replace channel mentions like <#C123456>
-    text = re.sub(r"<#([C][A-Z0-9]+)>", replace_channel, text)
+""" ---------- HELPER FUNCTIONS ---------- """
 
-    return text
 
+def get_user_channel_maps():
+    """Get dictionaries for converting user and channel IDs into readable names
 
-def format_ts(ts_str):
-    ts = float(ts_str.split('.')[0])
-    return datetime.datetime.fromtimestamp(ts, tz=PACIFIC).strftime("%Y-%m-%d %H:%M")
+    Returns
+    -------
+    user_map : `dict`
+        Map from user ID to "@username"
+    channel_map : `dict`
+        Map from channel ID to "#channel-name"
+    """
+    user_map = {user_id: f"@{name}" for user_id, name in directory.user_names().items()}
+    channel_map = {channel_id: f"#{name}" for channel_id, name in directory.channel_names().items()}
+    return user_map, channel_map
 
 
 def bonk_someone(message):
@@ -1528,7 +1664,7 @@ def bonk_someone(message):
                      "Bad grad student, I'll take away your :coffee:!",
                      "You're lucky Asimov made that first law mate...:robot_face::skull:",
                      "There's more where that came from"]
-        followup = np.random.choice(followups)
+        followup = random.choice(followups)
 
         app.client.chat_postMessage(text=f"BONK {person_to_bonk} :bonk::bonk:\n" + followup,
                                     thread_ts=message["ts"], channel=message["channel"])
@@ -1559,7 +1695,7 @@ def reply_brain_size(message, direct_msg=False):
     responses = [(f"Well my brain is {brain_size} lines of code long, so don't worry, it'll probably be a "
                   "couple of years until I'm intelligent enough to replace you :gerald-wink:"),
                  (f"Given that my brain is already {brain_size} lines of code long and the rate at which it's"
-                  f" growing, it'll probably be around {np.random.randint(2, 10)} years until I am able to "
+                  f" growing, it'll probably be around {random.randint(2, 9)} years until I am able to "
                   "~take over from you pesky humans~ help you even better! :innocent: :gerald-learning:"),
                  (f"I'm clocking a reasonable {brain_size} lines of code in my brain these days, which "
                   "unfortunately means I'm now over-qualified for reality TV :zany_face:"),
@@ -1567,7 +1703,7 @@ def reply_brain_size(message, direct_msg=False):
                   "code long! :brain::gerald-learning:")]
 
     thread_ts = None if direct_msg else message["ts"]
-    app.client.chat_postMessage(text=np.random.choice(responses),
+    app.client.chat_postMessage(text=random.choice(responses),
                                 channel=message["channel"], thread_ts=thread_ts)
 
 
@@ -1580,7 +1716,7 @@ def insert_british_consternation():
                ("Oh dear, one of my servers just imploded so that can't be a terribly positive "
                 "sign :exploding_head:"),
                "Ouch! Did you know errors hurt me? :smiling_face_with_tear:"]
-    return np.random.choice(choices)
+    return random.choice(choices)
 
 
 def find_channel(channel_name):
@@ -1596,16 +1732,8 @@ def find_channel(channel_name):
     ch_id : `str`
         ID of the Slack channel
     """
-    # grab the list of channels
-    channels = app.client.conversations_list(exclude_archived=True, limit=500)
-    ch_id = None
-
-    # go through each and find one with the same name
-    for channel in channels["channels"]:
-        if channel["name"] == channel_name:
-            # save the ID and break
-            ch_id = channel["id"]
-            break
+    # look up the channel in the (cached) workspace directory
+    ch_id = directory.channel_id(channel_name)
 
     # if you didn't find one then send out a warning (who changed the channel name!?)
     if ch_id is None:
@@ -1632,6 +1760,10 @@ def every_morning():
     if the_day == "Monday" and today.month not in [7, 8]:
         start_whinetime_workflow()
 
+    # check there are enough quotes the day before they go out
+    if the_day == "Monday":
+        warn_quote_stock()
+
     if the_day == "Tuesday":
         announce_quote()
 
@@ -1639,6 +1771,9 @@ def every_morning():
 
 # start Gerald
 if __name__ == "__main__":
+    # only needed when running for real so don't slow down importing the app
+    from apscheduler.schedulers.background import BackgroundScheduler
+
     scheduler = BackgroundScheduler({'apscheduler.timezone': 'US/Pacific'})
     scheduler.add_job(every_morning, "cron", hour=9, minute=32)
     scheduler.start()
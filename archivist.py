@@ -0,0 +1,652 @@
+import datetime
+import functools
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from zoneinfo import ZoneInfo
+from slack_sdk.errors import SlackApiError
+
+from rate_limits import TokenBucket, call_with_backoff
+
+PACIFIC = ZoneInfo("America/Los_Angeles")
+
+# conversations.history and conversations.replies are Tier 3 methods (50+ requests per minute each)
+HISTORY_LIMITER = TokenBucket(rate=50 / 60, capacity=5)
+REPLIES_LIMITER = TokenBucket(rate=50 / 60, capacity=5)
+
+# where the state and spooled pages of each export are kept
+EXPORT_DIR = "private_data/exports"
+
+# user mentions like <@U123456> and channel mentions like <#C123456>
+MENTION_REGEX = re.compile(r"<@([UW][A-Z0-9]+)>|<#(C[A-Z0-9]+)>")
+
+# file extension for each export format
+EXPORT_EXTENSIONS = {"text": "txt", "jsonl": "jsonl", "parquet": "parquet"}
+
+# channels that are currently being exported (only one export per channel since they share a state file)
+EXPORTS_RUNNING = set()
+EXPORTS_LOCK = threading.Lock()
+
+
+def export_channel_history(client, init_message, user_map, channel_map, export_format=None, compress=None,
+                           incremental=False, restart=False, cancel_event=None, status=None, max_workers=4):
+    """Export the full message history (including threads) of a channel, converting usernames and channel
+    names from Slack IDs to readable names.
+
+    Everything is streamed to disk as it arrives so memory use doesn't grow with the size of the channel.
+    Slack gives us the history newest first, so each page is written (in chronological order) to its own
+    spool file of JSON records and the spool files are joined in reverse order at the end, in whichever
+    format was requested. Thread replies are fetched
+    concurrently by a pool of workers, with every request going through a shared rate limiter.
+
+    Progress is checkpointed to ``private_data/exports/<channel_id>/state.json`` so if the export is
+    interrupted (by Slack or by a restart) then running it again picks up where it stopped. An incremental
+    export only fetches messages newer than the last export and appends them to it (note that new replies
+    to threads that were already exported won't be picked up).
+
+    Parameters
+    ----------
+    client : `WebClient`
+        Slack client
+    init_message : `Slack Message`
+        The initial message that triggered the export
+    user_map : `dict`
+        Map from user ID to "@username"
+    channel_map : `dict`
+        Map from channel ID to "#channel-name"
+    export_format : `str`, optional
+        Format of the export, one of "text" (human readable lines with mentions expanded), "jsonl" (one
+        JSON record per message) or "parquet" (typed columns, needs ``pyarrow``), by default None ("text",
+        or the format of the last export for an incremental export)
+    compress : `bool`, optional
+        Whether to compress the export, by default None (not compressed, or the same as the last export for
+        an incremental export)
+    incremental : `bool`, optional
+        Whether to only add messages that are newer than the last export, by default False. This is refused
+        if a different format is asked for than the last export was in.
+    restart : `bool`, optional
+        Whether to throw away any unfinished export and start again, by default False
+    cancel_event : `threading.Event`, optional
+        If this is set then the export stops at the next message (and can be resumed later), by default None
+    status : `function`, optional
+        Called with a short description of how far the export has got whenever that changes, by default None
+    max_workers : `int`, optional
+        Maximum number of threads being fetched at once, by default 4
+    """
+    channel_id = init_message["channel"]
+    with EXPORTS_LOCK:
+        if channel_id in EXPORTS_RUNNING:
+            client.chat_postMessage(text=("I'm already exporting this channel! Cancel that export first if "
+                                          "you want to start a different one :gerald-confused:"),
+                                    channel=channel_id, thread_ts=init_message["ts"])
+            return
+        EXPORTS_RUNNING.add(channel_id)
+
+    try:
+        run_export(client, init_message, user_map, channel_map, export_format=export_format,
+                   compress=compress, incremental=incremental, restart=restart, cancel_event=cancel_event,
+                   status=status, max_workers=max_workers)
+    finally:
+        with EXPORTS_LOCK:
+            EXPORTS_RUNNING.discard(channel_id)
+
+
+def run_export(client, init_message, user_map, channel_map, export_format=None, compress=None,
+               incremental=False, restart=False, cancel_event=None, status=None, max_workers=4):
+    """Run an export of a channel (see :func:`export_channel_history`, which makes sure that only one export
+    of each channel runs at once)"""
+    start_time = time.time()
+
+    # get the channel ID from the initial trigger message
+    channel_id = init_message["channel"]
+    export_dir = os.path.join(EXPORT_DIR, channel_id)
+    os.makedirs(export_dir, exist_ok=True)
+
+    def post(text):
+        client.chat_postMessage(text=text, channel=channel_id, thread_ts=init_message["ts"])
+
+    # work out whether we are resuming an export, adding to the last one or starting from scratch
+    previous = load_export_state(export_dir)
+    if previous is not None and previous["in_progress"] and not restart:
+        state = previous
+        message = "Picking up the unfinished export of this channel where it stopped..."
+    elif incremental and previous is not None and previous["latest_ts"] is not None \
+            and os.path.exists(previous["filename"]):
+        # new messages can only be added to the last export in the same format
+        if (export_format is not None and export_format != previous["format"]) \
+                or (compress is not None and compress != previous["compress"]):
+            last = describe_export(previous["format"], previous["compress"])
+            requested = describe_export(export_format or previous["format"],
+                                        previous["compress"] if compress is None else compress)
+            post(f"The last export of this channel was {last} so I can only add new messages to it in the "
+                 f"same format, not {requested}. Ask me to export the channel without \"new\" if you want a "
+                 "fresh export :gerald-confused:")
+            return
+        state = new_export_state(channel_id, previous["format"], previous["compress"])
+        state.update(filename=previous["filename"], append=True, oldest=previous["latest_ts"],
+                     latest_ts=previous["latest_ts"])
+        message = "Adding any new messages to the last export of this channel..."
+    else:
+        state = new_export_state(channel_id, export_format or "text", bool(compress))
+        message = "Starting export of channel history, this may take a while..."
+
+    # parquet is optional so check we can write it before doing any work
+    if state["format"] == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            post("Sorry, I can't make parquet exports without `pyarrow` installed :smiling_face_with_tear:")
+            return
+
+    post(message)
+    if state is not previous:
+        clear_spool(export_dir)
+        save_export_state(export_dir, state)
+
+    counts = dict(state["counts"])
+
+    def report(text):
+        if status is not None:
+            status(text)
+
+    def progress(n_threads):
+        post(f"Exported {n_threads} threads so far, continuing...")
+
+    def thread_error(ts, e):
+        post(f"Could not fetch replies for thread {ts}: {e.response['error']}")
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="archivist") as pool:
+        try:
+            # fetch every page of parent messages, writing each one to disk straight away
+            while not state["history_done"]:
+                response = fetch_history_page(client, channel_id, cursor=state["cursor"],
+                                              oldest=state["oldest"], latest=state.get("latest"))
+                messages = response["messages"]
+                for msg in messages:
+                    if state["latest_ts"] is None or float(msg["ts"]) > float(state["latest_ts"]):
+                        state["latest_ts"] = msg["ts"]
+
+                # if we stopped partway through this page then drop anything after the last checkpoint
+                spool_path = os.path.join(export_dir, f"{state['n_pages']:06d}.jsonl")
+                page_checkpoint = state["page"]
+                skip_until = None if page_checkpoint is None else page_checkpoint["last_ts"]
+                with open(spool_path, "a+b") as spool:
+                    spool.truncate(0 if page_checkpoint is None else page_checkpoint["offset"])
+
+                with open(spool_path, "a", encoding="utf-8") as spool:
+                    def checkpoint(msg):
+                        # save after every thread (the slow part) and every so often otherwise
+                        if msg.get("reply_count", 0) == 0 and counts["parents"] % 100 != 0:
+                            return
+                        spool.flush()
+                        state.update(page={"offset": spool.tell(), "last_ts": msg["ts"]},
+                                     counts=dict(counts))
+                        save_export_state(export_dir, state)
+                        report(f"{counts['parents']} messages and {counts['threads']} threads exported")
+
+                    finished = write_page(client, pool, channel_id, messages, spool, counts,
+                                          progress=progress, thread_error=thread_error,
+                                          window_size=4 * max_workers, skip_until=skip_until,
+                                          checkpoint=checkpoint, cancel_event=cancel_event)
+
+                # stop if we've been cancelled (everything up to the last checkpoint is kept)
+                if not finished:
+                    post(f"Okay, I've stopped exporting after {counts['parents']} messages. Ask me to export "
+                         "the channel again and I'll pick up where I left off.")
+                    return
+
+                next_cursor = response.get("response_metadata", {}).get("next_cursor")
+                state.update(cursor=next_cursor or None, history_done=not next_cursor,
+                             n_pages=state["n_pages"] + 1, page=None, counts=dict(counts))
+                save_export_state(export_dir, state)
+                report(f"{counts['parents']} messages and {counts['threads']} threads exported "
+                       f"({state['n_pages']} pages)")
+        except SlackApiError as e:
+            client.chat_postMessage(text=(f"Failed to fetch messages: {e.response['error']}. Ask me to "
+                                          "export the channel again and I'll pick up where I left off."),
+                                    channel=channel_id)
+            return
+
+    # nothing to do if there's nothing new since the last export
+    if state["append"] and counts["parents"] == 0:
+        finish_export(export_dir, state)
+        post("There are no new messages since the last export of this channel!")
+        return
+
+    # join the pages back together (oldest first) and tidy up
+    report(f"writing the {state['format']} file")
+    join_spool(export_dir, state, user_map, channel_map)
+    finish_export(export_dir, state)
+
+    # let them know how many threads we found and what the total messages are
+    post(f"Found {counts['parents']} {'new ' if state['append'] else ''}parent messages and "
+         f"{counts['threads']} threads in this channel, total messages exported: {counts['lines']}. "
+         f"Entire process took {time.time() - start_time:.2f} seconds.")
+    print(f"Found {counts['threads']} threads in this channel, total messages exported: {counts['lines']}")
+
+    # send the file to the channel
+    report("uploading the export")
+    try:
+        client.files_upload_v2(
+            channel=channel_id,
+            initial_comment="Here's the full history of this channel!",
+            file=state["filename"],
+            title="Channel Export (with Threads)"
+        )
+    except SlackApiError as e:
+        client.chat_postMessage(text=f"Failed to upload the export file: {e.response['error']}",
+                                channel=channel_id)
+
+
+def describe_export(export_format, compress):
+    """Describe the format of an export (e.g. "gzipped jsonl")"""
+    if export_format == "parquet":
+        return "parquet" + (" (zstd)" if compress else "")
+    return ("gzipped " if compress else "") + export_format
+
+
+def new_export_state(channel_id, export_format="text", compress=False):
+    """Create the state of a brand new export
+
+    Parameters
+    ----------
+    channel_id : `str`
+        ID of the channel
+    export_format : `str`, optional
+        Format of the export ("text", "jsonl" or "parquet"), by default "text"
+    compress : `bool`, optional
+        Whether to compress the export, by default False
+
+    Returns
+    -------
+    state : `dict`
+        State of the export
+    """
+    return {
+        "in_progress": True,
+        "filename": f"channel_export_{channel_id}.{EXPORT_EXTENSIONS[export_format]}"
+                    + (".gz" if compress and export_format != "parquet" else ""),
+        "format": export_format,
+        "compress": compress,
+        "append": False,            # whether we are adding to the end of an existing export
+        "base_size": None,          # size of that existing export before we started adding to it
+        "oldest": None,             # only export messages newer than this timestamp
+        "latest": f"{time.time():.6f}",     # and older than this one (when we started) so pages don't move
+        "latest_ts": None,          # newest message that we've seen
+        "cursor": None,             # cursor for the page of history that we are on
+        "history_done": False,
+        "n_pages": 0,               # number of pages that have been completely written to the spool
+        "page": None,               # checkpoint within the current page
+        "counts": {"parents": 0, "threads": 0, "lines": 0}
+    }
+
+
+def load_export_state(export_dir):
+    """Load the state of the last export of a channel (None if there isn't one)"""
+    path = os.path.join(export_dir, "state.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_export_state(export_dir, state):
+    """Save the state of an export, replacing the old one in a single step so it is never half-written"""
+    path = os.path.join(export_dir, "state.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def clear_spool(export_dir):
+    """Delete every page in the spool of an export"""
+    for file in os.listdir(export_dir):
+        if file.endswith(".jsonl"):
+            os.remove(os.path.join(export_dir, file))
+
+
+def join_spool(export_dir, state, user_map, channel_map):
+    """Join the spooled pages of an export (oldest first) into the final file
+
+    Parameters
+    ----------
+    export_dir : `str`
+        Directory containing the spool
+    state : `dict`
+        State of the export
+    user_map : `dict`
+        Map from user ID to "@username"
+    channel_map : `dict`
+        Map from channel ID to "#channel-name"
+    """
+    pages = [os.path.join(export_dir, f"{k:06d}.jsonl") for k in reversed(range(state["n_pages"]))]
+    if state["format"] == "parquet":
+        write_parquet(state["filename"], pages, compress=state["compress"], append=state["append"])
+        return
+
+    filename = state["filename"]
+    if state["append"]:
+        # remember how big the export was before so that we can undo a half-finished append
+        if state["base_size"] is None:
+            state["base_size"] = os.path.getsize(filename)
+            save_export_state(export_dir, state)
+        f = open(filename, "r+b")
+        f.truncate(state["base_size"])
+        f.seek(state["base_size"])
+    else:
+        f = open(filename + ".tmp", "wb")
+
+    with f:
+        # a gzip file can have several members one after the other so we can just append a new one
+        out = gzip.GzipFile(fileobj=f, mode="wb") if state["compress"] else f
+        for page in pages:
+            with open(page, "rb") as spool:
+                if state["format"] == "jsonl":
+                    shutil.copyfileobj(spool, out)
+                else:
+                    for line in spool:
+                        out.write((format_record(json.loads(line), user_map, channel_map) + "\n").encode())
+        if state["compress"]:
+            out.close()
+
+    if not state["append"]:
+        os.replace(filename + ".tmp", filename)
+
+
+def write_parquet(filename, pages, compress=False, append=False):
+    """Write spooled pages of records to a parquet file, one row group per page
+
+    Parameters
+    ----------
+    filename : `str`
+        Path to the parquet file
+    pages : `list`
+        Paths to each page of records, in the order to write them
+    compress : `bool`, optional
+        Whether to use zstd compression rather than the default (snappy), by default False
+    append : `bool`, optional
+        Whether to keep the rows already in the file, by default False
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("ts", pa.timestamp("us", tz="UTC")),
+        ("thread_ts", pa.timestamp("us", tz="UTC")),
+        ("user", pa.string()),
+        ("text", pa.string()),
+        ("reactions", pa.list_(pa.struct([("name", pa.string()), ("count", pa.int32())]))),
+        ("reply_count", pa.int32()),
+        ("is_reply", pa.bool_()),
+    ])
+
+    # parquet files can't be appended to so write a new one (copying over the old rows if needed)
+    with pq.ParquetWriter(filename + ".tmp", schema, compression="zstd" if compress else "snappy") as writer:
+        if append:
+            for batch in pq.ParquetFile(filename).iter_batches():
+                writer.write_batch(batch)
+        for page in pages:
+            with open(page) as spool:
+                records = [json.loads(line) for line in spool]
+
+            # store the timestamps as actual timestamps rather than Slack's strings
+            for record in records:
+                record["ts"] = parse_slack_ts(record["ts"])
+                record["thread_ts"] = parse_slack_ts(record["thread_ts"])
+            if len(records) > 0:
+                writer.write_table(pa.Table.from_pylist(records, schema=schema))
+    os.replace(filename + ".tmp", filename)
+
+
+def parse_slack_ts(ts):
+    """Convert a Slack timestamp (e.g. "1700000000.123456") to a UTC `datetime` (None stays None)"""
+    if ts is None:
+        return None
+    return datetime.datetime.fromtimestamp(float(ts), tz=datetime.timezone.utc)
+
+
+def finish_export(export_dir, state):
+    """Mark an export as finished and delete its spool"""
+    state.update(in_progress=False, base_size=None, cursor=None, page=None)
+    save_export_state(export_dir, state)
+    clear_spool(export_dir)
+
+
+def fetch_history_page(client, channel_id, cursor=None, oldest=None, latest=None, limit=1000):
+    """Fetch a single page of a channel's history (newest first)
+
+    Parameters
+    ----------
+    client : `WebClient`
+        Slack client
+    channel_id : `str`
+        ID of the channel
+    cursor : `str`, optional
+        Cursor for the page, by default None (the first page)
+    oldest : `str`, optional
+        Only fetch messages newer than this timestamp, by default None (all messages)
+    latest : `str`, optional
+        Only fetch messages older than this timestamp, by default None (up to now)
+    limit : `int`, optional
+        Number of messages in each page, by default 1000
+
+    Returns
+    -------
+    response : `SlackResponse`
+        Response containing the page of messages
+    """
+    kwargs = {key: value for key, value in [("oldest", oldest), ("latest", latest)] if value is not None}
+    return call_with_backoff(client.conversations_history, limiter=HISTORY_LIMITER,
+                             channel=channel_id, limit=limit, cursor=cursor, **kwargs)
+
+
+def write_page(client, pool, channel_id, messages, f, counts, progress=None, thread_error=None,
+               window_size=16, skip_until=None, checkpoint=None, cancel_event=None):
+    """Write a page of history, with the replies to any threads, to a file of JSON records in chronological
+    order
+
+    Parameters
+    ----------
+    client : `WebClient`
+        Slack client
+    pool : `ThreadPoolExecutor`
+        Pool used to fetch thread replies in the background
+    channel_id : `str`
+        ID of the channel
+    messages : `list`
+        Page of messages (newest first)
+    f : `file`
+        File to write to
+    counts : `dict`
+        Running counts of "parents", "threads" and "lines" (updated in place)
+    progress : `function`, optional
+        Called with the number of threads so far after every 50 threads, by default None
+    thread_error : `function`, optional
+        Called with the thread timestamp and the error if a thread can't be fetched, by default None
+    window_size : `int`, optional
+        Maximum number of messages waiting on their replies, by default 16
+    skip_until : `str`, optional
+        Skip every message up to and including this timestamp (since they were already written), by
+        default None
+    checkpoint : `function`, optional
+        Called with each message once it (and any replies) has been written, by default None
+    cancel_event : `threading.Event`, optional
+        If this is set then stop writing at the next message, by default None
+
+    Returns
+    -------
+    finished : `bool`
+        Whether the whole page was written (False if it was cancelled)
+    """
+    def write_message(msg, replies_future):
+        # add the parent message
+        f.write(json.dumps(message_record(msg)) + "\n")
+        counts["parents"] += 1
+        counts["lines"] += 1
+
+        # add any replies underneath it
+        if replies_future is not None:
+            counts["threads"] += 1
+            if progress is not None and counts["threads"] % 50 == 0:
+                progress(counts["threads"])
+            try:
+                for reply in iter_replies(client, channel_id, msg["ts"], replies_future.result()):
+                    f.write(json.dumps(message_record(reply, is_reply=True)) + "\n")
+                    counts["lines"] += 1
+            except SlackApiError as e:
+                if thread_error is not None:
+                    thread_error(msg["ts"], e)
+
+        if checkpoint is not None:
+            checkpoint(msg)
+
+    # go through the messages in chronological order, fetching the replies to any threads in the
+    # background while keeping a limited window of messages waiting to be written
+    window = deque()
+    for msg in reversed(messages):
+        if skip_until is not None and float(msg["ts"]) <= float(skip_until):
+            continue
+
+        if cancel_event is not None and cancel_event.is_set():
+            # don't bother fetching any threads that we won't write
+            for _, replies_future in window:
+                if replies_future is not None:
+                    replies_future.cancel()
+            return False
+
+        replies_future = None
+        if msg.get("thread_ts") == msg.get("ts") and msg.get("reply_count", 0) > 0:
+            replies_future = pool.submit(fetch_replies_page, client, channel_id, msg["ts"])
+        window.append((msg, replies_future))
+
+        if len(window) > window_size:
+            write_message(*window.popleft())
+
+    while len(window) > 0:
+        write_message(*window.popleft())
+    return True
+
+
+def fetch_replies_page(client, channel_id, ts, cursor=None):
+    """Fetch a single page of a thread
+
+    Parameters
+    ----------
+    client : `WebClient`
+        Slack client
+    channel_id : `str`
+        ID of the channel
+    ts : `str`
+        Timestamp of the parent message
+    cursor : `str`, optional
+        Cursor for the page, by default None (the first page)
+
+    Returns
+    -------
+    response : `SlackResponse`
+        Response containing the page of messages
+    """
+    return call_with_backoff(client.conversations_replies, limiter=REPLIES_LIMITER,
+                             channel=channel_id, ts=ts, limit=200, cursor=cursor)
+
+
+def iter_replies(client, channel_id, ts, first_page):
+    """Iterate over every reply in a thread (not including the parent message), fetching each page after the
+    first one only once the previous page has been used up
+
+    Parameters
+    ----------
+    client : `WebClient`
+        Slack client
+    channel_id : `str`
+        ID of the channel
+    ts : `str`
+        Timestamp of the parent message
+    first_page : `SlackResponse`
+        The first page of the thread (from :func:`fetch_replies_page`)
+
+    Yields
+    ------
+    reply : `dict`
+        Each reply in the thread
+    """
+    page = first_page
+    while True:
+        for reply in page.get("messages", []):
+            # every page starts with the parent message so skip it
+            if reply.get("ts") != ts:
+                yield reply
+        cursor = page.get("response_metadata", {}).get("next_cursor")
+        if not cursor:
+            break
+        page = fetch_replies_page(client, channel_id, ts, cursor=cursor)
+
+
+def message_record(msg, is_reply=False):
+    """Convert a Slack message into a record for the export
+
+    Parameters
+    ----------
+    msg : `dict`
+        Slack message
+    is_reply : `bool`, optional
+        Whether the message is a reply in a thread, by default False
+
+    Returns
+    -------
+    record : `dict`
+        Record with "ts", "thread_ts", "user", "text", "reactions", "reply_count" and "is_reply"
+    """
+    return {
+        "ts": msg.get("ts"),
+        "thread_ts": msg.get("thread_ts"),
+        "user": msg.get("user"),
+        "text": msg.get("text", ""),
+        "reactions": [{"name": reaction["name"], "count": reaction.get("count", 0)}
+                      for reaction in msg.get("reactions", [])],
+        "reply_count": msg.get("reply_count", 0),
+        "is_reply": is_reply
+    }
+
+
+def format_record(record, user_map, channel_map):
+    """Format a record as a line of a text export (with replies indented under their thread)"""
+    line = format_message(record, user_map, channel_map)
+    return "    → " + line if record["is_reply"] else line
+
+
+def format_message(msg, user_map, channel_map):
+    """Format a message as a line of the export"""
+    ts = msg.get("ts", "unknown")
+    text = msg.get("text", "").replace("\n", " ")
+    user_id = msg.get("user") or "unknown"
+    username = user_map.get(user_id, f"<{user_id}>")
+    return f"{format_ts(ts)}: {username}: {expand_mentions(text, user_map, channel_map)}"
+
+
+def expand_mentions(text, user_map, channel_map):
+    """Replace user mentions like <@U123456> and channel mentions like <#C123456> with readable names"""
+    def replace(match):
+        user_id, channel_id = match.groups()
+        if user_id is not None:
+            return user_map.get(user_id, match.group(0))
+        return channel_map.get(channel_id, match.group(0))
+
+    return MENTION_REGEX.sub(replace, text)
+
+
+def format_ts(ts_str):
+    """Format a Slack timestamp as a Pacific time to the nearest minute"""
+    return format_minute(int(ts_str.split('.')[0]) // 60)
+
+
+@functools.lru_cache(maxsize=4096)
+def format_minute(minute):
+    """Format a number of minutes since the epoch (cached since messages tend to come in bursts)"""
+    return datetime.datetime.fromtimestamp(minute * 60, tz=PACIFIC).strftime("%Y-%m-%d %H:%M")
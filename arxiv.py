@@ -1,14 +1,79 @@
 import xml.etree.ElementTree as ET
-from urllib.request import urlopen
+from urllib.request import Request, urlopen
 from urllib.error import HTTPError
 from datetime import date
-import numpy as np
+import heapq
+import json
+import os
+import tempfile
 
 namespace = "{http://www.w3.org/2005/Atom}"
 
+# where we keep the last copy of each feed (and its ETag/Last-Modified headers)
+FEED_CACHE_DIR = "private_data/arxiv_feeds"
 
-def get_papers_by_orcid(orcid):
-    """Get a list of papers from the arXiv matching an ORCID ID
+# how long to wait for arXiv (in seconds) before giving up on a feed
+FEED_TIMEOUT = 30
+
+
+class CachingReader:
+    """Wrap an HTTP response so that everything read from it is also saved to the feed cache
+
+    The cache file and its headers are only saved once the whole response has been read, which includes
+    when the caller stopped parsing early but had already read to the end (the parser reads ahead in
+    chunks, so this is usual for small feeds). Otherwise the response is closed without downloading the
+    rest and the partial copy is thrown away (so next time we either get a 304 for the old cached copy or
+    download the feed again). Each download goes to its own temporary file so simultaneous downloads of
+    the same feed can't mix together.
+
+    Parameters
+    ----------
+    response : `http.client.HTTPResponse`
+        Response containing the feed
+    cache_path : `str`
+        Path of the cached feed
+    """
+    def __init__(self, response, cache_path):
+        self.response = response
+        self.cache_path = cache_path
+        self.temp_file = tempfile.NamedTemporaryFile(dir=os.path.dirname(cache_path), suffix=".tmp",
+                                                     delete=False)
+        self.finished = False
+
+    def read(self, size=-1):
+        data = self.response.read(size)
+        self.temp_file.write(data)
+
+        # the response closes itself once the last byte has been read
+        if not data or size < 0 or self.response.isclosed():
+            self.finished = True
+        return data
+
+    def close(self, complete=True):
+        """Close the response, saving it to the cache if all of it was read
+
+        Parameters
+        ----------
+        complete : `bool`, optional
+            Whether the feed was read without any problems (it may still have been stopped early), by
+            default True
+        """
+        self.temp_file.close()
+        self.response.close()
+
+        if complete and self.finished:
+            os.replace(self.temp_file.name, self.cache_path)
+            with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(self.cache_path), suffix=".tmp",
+                                             delete=False) as headers_file:
+                json.dump({"etag": self.response.headers.get("ETag"),
+                           "last_modified": self.response.headers.get("Last-Modified")}, headers_file)
+            os.replace(headers_file.name, self.cache_path + ".json")
+        else:
+            os.remove(self.temp_file.name)
+
+
+def open_feed(orcid):
+    """Open the arXiv feed for an ORCID ID, only downloading it if it has changed since last time
 
     Parameters
     ----------
@@ -17,34 +82,103 @@ def get_papers_by_orcid(orcid):
 
     Returns
     -------
-    papers : `list` of `dict`s
-        Each paper contains a link, date, title, abstract and the authors. Returns None if ORCID is invalid/
-        isn't linked to arXiv account.
+    feed : `file-like`
+        Readable feed, which should be closed once you're done with it. None if the ORCID is invalid/isn't
+        linked to an arXiv account.
     """
+    os.makedirs(FEED_CACHE_DIR, exist_ok=True)
+    cache_path = os.path.join(FEED_CACHE_DIR, f"{orcid}.atom2")
+
+    # if we have a cached copy then ask arXiv to only send the feed if it has changed
+    request = Request(f"https://arxiv.org/a/{orcid}.atom2")
+    if os.path.exists(cache_path) and os.path.exists(cache_path + ".json"):
+        with open(cache_path + ".json") as headers_file:
+            headers = json.load(headers_file)
+        if headers["etag"] is not None:
+            request.add_header("If-None-Match", headers["etag"])
+        if headers["last_modified"] is not None:
+            request.add_header("If-Modified-Since", headers["last_modified"])
+
     # get the data from the arXiv
     try:
-        data = urlopen(f"https://arxiv.org/a/{orcid}.atom2")
-    except HTTPError:
+        response = urlopen(request, timeout=FEED_TIMEOUT)
+    except HTTPError as e:
+        # 304 means that nothing has changed so we can just use the cache
+        if e.code == 304:
+            return open(cache_path, "rb")
         return None
+    return CachingReader(response, cache_path)
 
-    # parse the XML
-    root = ET.fromstring(data.read())
 
-    # go through each entry in the list
-    papers = []
-    for entry in root.iter(f"{namespace}entry"):
-        # convert the *published* date to year/month/day
-        year, month, day = map(int, entry.find(f"{namespace}published").text.split("T")[0].split("-"))
+def iter_feed_entries(feed):
+    """Parse an arXiv feed bit by bit, yielding each paper as soon as its entry has been read
+
+    Parameters
+    ----------
+    feed : `file-like`
+        Readable feed
+
+    Yields
+    ------
+    paper : `dict`
+        A link, date, title, abstract and the authors of the paper
+    updated : `datetime.date`
+        When the paper was last updated
+    """
+    for _, element in ET.iterparse(feed, events=("end",)):
+        if element.tag != f"{namespace}entry":
+            continue
+
+        # convert the *published* and updated dates to year/month/day
+        year, month, day = map(int, element.find(f"{namespace}published").text.split("T")[0].split("-"))
+        updated = date(*map(int, element.find(f"{namespace}updated").text.split("T")[0].split("-")))
 
-        # add the paper to the list
         paper = {
-            "link": entry.find(f"{namespace}id").text,
+            "link": element.find(f"{namespace}id").text,
             "date": date(year=year, month=month, day=day),
-            "title": entry.find(f"{namespace}title").text,
-            "abstract": entry.find(f"{namespace}summary").text,
-            "authors": entry.find(f"{namespace}author").find(f"{namespace}name").text,
+            "title": element.find(f"{namespace}title").text,
+            "abstract": element.find(f"{namespace}summary").text,
+            "authors": element.find(f"{namespace}author").find(f"{namespace}name").text,
         }
-        papers.append(paper)
+
+        # throw away the entry now that we're done with it
+        element.clear()
+        yield paper, updated
+
+
+def close_feed(feed, complete):
+    """Close a feed from :func:`open_feed`, saving it to the cache if it was a fresh download that was
+    read without problems (even if it was stopped early, as long as the download had finished)"""
+    if isinstance(feed, CachingReader):
+        feed.close(complete=complete)
+    else:
+        feed.close()
+
+
+def get_papers_by_orcid(orcid):
+    """Get a list of papers from the arXiv matching an ORCID ID
+
+    Parameters
+    ----------
+    orcid : `str`
+        ORCID ID
+
+    Returns
+    -------
+    papers : `list` of `dict`s
+        Each paper contains a link, date, title, abstract and the authors. Returns None if ORCID is invalid/
+        isn't linked to arXiv account.
+    """
+    feed = open_feed(orcid)
+    if feed is None:
+        return None
+
+    complete = False
+    try:
+        papers = [paper for paper, _ in iter_feed_entries(feed)]
+        complete = True
+    finally:
+        close_feed(feed, complete)
     return papers
 
 
@@ -52,6 +186,9 @@ def get_n_most_recent_papers(orcid, n):
     """Get the n most recently *published* papers associated with an ORCID id (they are sorted by latest
     updated which is not the same)
 
+    Since a paper can't be published after it was last updated, we stop reading the feed as soon as we have
+    n papers published more recently than the last update of the next entry.
+
     Parameters
     ----------
     orcid : `str`
@@ -67,20 +204,60 @@ def get_n_most_recent_papers(orcid, n):
     most_recent_time : `list` of `int`
         How many days since each was published. None if ORCID invalid/not linked to arXiv.
     """
-    # get today's date and all of the papers
-    today = date.today()
-    papers = get_papers_by_orcid(orcid)
-    if papers is None:
+    feed = open_feed(orcid)
+    if feed is None:
         return None, None
 
-    # go through each and find how long it's been since they've been published
-    time_since_published = [(today - paper["date"]).days for paper in papers]
+    papers = []
 
-    sort_order = np.argsort(time_since_published)
-    sorted_papers = np.array(papers)[sort_order]
-    sorted_times = np.array(time_since_published)[sort_order]
+    # keep track of the n most recent publication dates (the oldest of these is at the front)
+    newest_dates = []
+    complete = False
+    try:
+        for paper, updated in iter_feed_entries(feed):
+            # nothing from here on can be more recent than what we've already got (so don't download it)
+            if len(newest_dates) == n and newest_dates[0] >= updated:
+                break
+            papers.append(paper)
+            if len(newest_dates) < n:
+                heapq.heappush(newest_dates, paper["date"])
+            else:
+                heapq.heappushpop(newest_dates, paper["date"])
+
+        # stopping early is fine, the feed is still cached if it had already been downloaded in full
+        complete = True
+    finally:
+        close_feed(feed, complete)
+
+    return most_recent_papers(papers, n)
+
+
+def most_recent_papers(papers, n, today=None):
+    """Pick out the n most recently published papers from a list
 
-    return sorted_papers[:n], sorted_times[:n]
+    Works with papers from either the arXiv feed or :func:`ads_query.get_ads_papers` since both have a
+    "date" for each paper.
+
+    Parameters
+    ----------
+    papers : `list` of `dict`
+        Papers to choose from
+    n : `int`
+        How many papers
+    today : `datetime.date`, optional
+        Date to count the days since publication from, by default today
+
+    Returns
+    -------
+    most_recent : `list` of `dict`
+        Most recent n papers (newest first)
+
+    most_recent_time : `list` of `int`
+        How many days since each was published
+    """
+    today = date.today() if today is None else today
+    most_recent = heapq.nlargest(n, papers, key=lambda paper: paper["date"])
+    return most_recent, [(today - paper["date"]).days for paper in most_recent]
 
 
 def bold_grad_author(author_string, name):
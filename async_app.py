@@ -0,0 +1,334 @@
+"""Gerald on asyncio (run ``python async_app.py`` instead of ``python app.py``)
+
+Events are handled on a single event loop with an ``AsyncApp`` so lots of them can be in flight at once
+without needing a thread each. Reactions, replies, new emoji and the whinetime buttons/modal all talk to
+Slack through the ``AsyncWebClient``. Anything that blocks (the roster, the whinetime file, the workspace
+directory on a cache miss) is run on the default executor, and the slow actions (papers, exports) still go
+through the background job runner from ``app.py`` so they never hold up the event loop.
+
+The trigger tables, reply text, roster, directory and job runner are shared with ``app.py`` so the two
+modes always behave the same. Importing it still creates its (sync) ``App``, but none of its listeners
+are used here. Its ``WebClient`` is only used off the event loop: by background jobs, by directory lookups
+and by the scheduled morning tasks.
+"""
+import asyncio
+import functools
+import os
+import random
+import re
+
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+from slack_sdk.errors import SlackApiError
+
+import app as sync_app
+from rate_limits import async_call_with_backoff
+import quotes
+
+app = AsyncApp(token=os.environ.get("SLACK_BOT_TOKEN"))
+
+
+async def run_sync(func, *args, **kwargs):
+    """Run a blocking function on the default executor so it doesn't hold up the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+async def reply(message, text, direct_msg=False):
+    """Reply to a message (in a thread unless it's a direct message)"""
+    await app.client.chat_postMessage(text=text, channel=message["channel"],
+                                      thread_ts=None if direct_msg else message["ts"])
+
+
+""" ---------- MESSAGE DETECTIONS ---------- """
+
+
+@app.event("message")
+async def handle_message_events(body, logger, say):
+    logger.info(body)
+
+    # skip anything that Slack has already sent us (it retries if we're slow to acknowledge)
+    if not sync_app.recent_events.first_time(body.get("event_id"), "message"):
+        return
+
+    # if the message was a direct message
+    if body["event"]["channel_type"] == "im":
+        # and it wasn't from Gerald himself (AHHH infinite loop worry)
+        if "message" in body["event"] and body["event"]["message"]["user"] == sync_app.GERALD_ID:
+            return
+
+        # get the people in the direct message chat
+        members = (await app.client.conversations_members(channel=body["event"]["channel"]))["members"]
+
+        # if there are only two and one is Gerald then handle like you would mentions
+        if len(members) == 2 and sync_app.GERALD_ID in members:
+            await reply_to_mentions(say, body, direct_msg=True)
+
+    message = sync_app.message_from_event(body["event"])
+    if message is None:
+        return
+
+    # detect whether anyone has written a quote (but only save it once it is a quote, even if it gets edited)
+    if message["channel"] == await run_sync(sync_app.find_channel, sync_app.QUOTES_CHANNEL) \
+            and quotes.is_quote(message["text"]) and sync_app.claim_for_message(message, ["quote"]):
+        await run_sync(quotes.save_quote, message["text"])
+
+    await reaction_trigger(message)
+
+    # bonk anyone who deserves it (but only once per message)
+    if message["text"].lower().find("bonk") >= 0 \
+            and sync_app.claim_for_message(message, [("action", "bonk")]):
+        await run_sync(sync_app.bonk_someone, message)
+
+
+""" ---------- MESSAGE REACTIONS ---------- """
+
+
+async def reaction_trigger(message):
+    """React to a message with the reactions of every trigger in ``REACTION_TRIGGERS`` that it matches, adding
+    all of the reactions concurrently
+
+    Parameters
+    ----------
+    message : `Slack Message`
+        Object containing slack message
+    """
+    reactions = sync_app.new_reactions(message)
+
+    # dict.fromkeys removes duplicates but keeps the order
+    await asyncio.gather(*[add_reaction(message["channel"], message["ts"], name)
+                           for name in dict.fromkeys(reactions)])
+
+
+async def add_reaction(channel, ts, name):
+    """Add a single reaction to a message, waiting and retrying if we're rate limited"""
+    try:
+        await async_call_with_backoff(app.client.reactions_add, channel=channel, timestamp=ts, name=name)
+    except SlackApiError as e:
+        if e.response["error"] == "invalid_name":
+            print(f"WARNING: no such emoji '{name}'")
+        elif e.response["error"] not in ("no_reaction", "already_reacted"):
+            print(f"WARNING: failed to add reaction '{name}' after retries:", e)
+
+
+""" ---------- APP MENTIONS ---------- """
+
+
+@app.event("app_mention")
+async def reply_to_mentions(say, body, direct_msg=False):
+    message = body["event"]
+
+    # skip anything that Slack has already sent us (it retries if we're slow to acknowledge)
+    if not sync_app.recent_events.first_time(body.get("event_id"), "mention"):
+        return
+
+    # reply to mentions with specific messages
+    thread_ts = None if direct_msg else message["ts"]
+    if await mention_trigger(message=message["text"], thread_ts=thread_ts, ch_id=message["channel"]):
+        return
+
+    # perform actions based on mentions
+    for regex, action, case, pass_message in sync_app.mention_actions():
+        replied = await mention_action(message=message, regex=regex, action=action, case_sensitive=case,
+                                       pass_message=pass_message, direct_msg=direct_msg)
+
+        # return immediately if you match one
+        if replied:
+            return
+
+    # send a catch-all message if nothing matches
+    thread_ts = None if direct_msg else body["event"]["ts"]
+    await say(text=sync_app.catch_all_reply(), thread_ts=thread_ts, channel=body["event"]["channel"])
+
+
+async def mention_action(message, regex, action, case_sensitive=False, pass_message=True, direct_msg=False):
+    """Perform an action based on a message that mentions Gerald if it matches a regular expression (see
+    :func:`app.mention_action`)
+
+    Actions with an async version in ``ASYNC_ACTIONS`` are awaited, slow actions are run as background jobs
+    and anything else is run on the default executor.
+
+    Returns
+    -------
+    match : `bool`
+        Whether the regex was matched
+    """
+    flags = 0 if case_sensitive else re.IGNORECASE
+    if not re.search(regex, message["text"], flags=flags):
+        return False
+
+    args, kwargs = ([message], {"direct_msg": direct_msg}) if pass_message else ([], {})
+    if action in ASYNC_ACTIONS:
+        await ASYNC_ACTIONS[action](*args, **kwargs)
+    elif action in sync_app.BACKGROUND_JOBS:
+        # submitting takes the job runner's lock and may post a message so don't do it on the event loop
+        await run_sync(sync_app.job_runner.submit, sync_app.BACKGROUND_JOBS[action], action, *args,
+                       user=message.get("user"), channel=message["channel"],
+                       thread_ts=None if direct_msg else message["ts"], **kwargs)
+    else:
+        await run_sync(action, *args, **kwargs)
+    return True
+
+
+async def mention_trigger(message, thread_ts=None, ch_id=None):
+    """Respond to a mention of the app if it contains any of the phrases in ``MENTION_TRIGGERS`` (see
+    :func:`app.mention_trigger`)
+
+    Returns
+    -------
+    matched : `bool`
+        Whether any of the triggers matched
+    """
+    group = sync_app.MENTION_MATCHER.first_match(message)
+    if group is None:
+        return False
+
+    # if the response is a list then pick a random one
+    response = sync_app.mention_responses()[group]
+    if isinstance(response, list):
+        response = random.choice(response)
+
+    await app.client.chat_postMessage(channel=ch_id, text=response, thread_ts=thread_ts)
+    return True
+
+
+""" ---------- EMOJI HANDLING ---------- """
+
+
+@app.event("emoji_changed")
+async def new_emoji(body, say):
+    if body["event"]["subtype"] == "add":
+        ch_id = await run_sync(sync_app.find_channel, "random")
+        await say(sync_app.new_emoji_message(body["event"]["name"]), channel=ch_id)
+
+
+""" ---------- WORKSPACE DIRECTORY ---------- """
+
+
+@app.event("channel_rename")
+@app.event("channel_created")
+async def update_directory_channel(body):
+    sync_app.update_directory_channel(body)
+
+
+@app.event("channel_deleted")
+@app.event("channel_archive")
+@app.event("channel_unarchive")
+async def invalidate_directory_channels():
+    sync_app.invalidate_directory_channels()
+
+
+@app.event("user_change")
+@app.event("team_join")
+async def update_directory_user(body):
+    sync_app.update_directory_user(body)
+
+
+""" ---------- WHINETIME ---------- """
+
+
+@app.view("whinetime-modal")
+async def whinetime_submit(ack, body, logger):
+    await ack()
+
+    # switch to the next host for next time (the host order lives on disk so this is run on the executor)
+    next_host = await run_sync(sync_app.wt.rotate_hosts)
+    next_host_id = await run_sync(sync_app.directory.user_id, next_host)
+
+    # let the next host that their time is coming
+    dm = await app.client.conversations_open(users=next_host_id)
+    await app.client.chat_postMessage(text=sync_app.NEXT_HOST_MESSAGE, channel=dm["channel"]["id"])
+
+    # remove the buttons from the announcement now that we have a plan
+    latest = sync_app.latest_whinetime_message
+    if latest is not None:
+        sync_app.latest_whinetime_message = None
+        await app.client.chat_delete(channel=latest["channel"], ts=latest["ts"])
+
+    host, location, dt = sync_app.read_whinetime_form(body["view"])
+    ch_id = await run_sync(sync_app.find_channel, "whinetime")
+
+    # tell people the plan, start the reactions going and schedule the reminders
+    message = await app.client.chat_postMessage(text=sync_app.whinetime_plan_text(host, location, dt),
+                                                channel=ch_id)
+    await app.client.reactions_add(channel=ch_id, timestamp=message["ts"], name="beers")
+    for text, post_at in sync_app.whinetime_reminders(ch_id, location, dt):
+        try:
+            logger.info(await app.client.chat_scheduleMessage(channel=ch_id, text=text, post_at=post_at))
+        except SlackApiError as e:
+            logger.error("Error scheduling message: {}".format(e))
+
+
+@app.action("whinetime-open")
+async def whinetime_logistics(ack, body):
+    await ack()
+    await app.client.views_open(trigger_id=body["trigger_id"],
+                                view=sync_app.whinetime_modal(body["actions"][0]["value"]))
+
+
+@app.action("whinetime-re-roll")
+async def whinetime_re_roll(ack, body, logger):
+    await ack()
+    logger.info(body)
+    await app.client.chat_delete(channel=body["container"]["channel_id"], ts=body["container"]["message_ts"])
+    await start_whinetime_workflow(reroll=True, host=await run_sync(sync_app.wt.rotate_hosts))
+
+
+async def start_whinetime_workflow(reroll=False, host=None):
+    """Announce the whinetime host (see :func:`app.start_whinetime_workflow`)"""
+    ch_id = await run_sync(sync_app.find_channel, "whinetime")
+    host = await run_sync(sync_app.wt.get_next_host) if host is None else host
+    host_id = await run_sync(sync_app.directory.user_id, host)
+
+    text = sync_app.reroll_message(host_id) if reroll else ("Drumroll please :drum_with_drumsticks:...it's "
+                                                            "time to pick a whinetime host")
+    await app.client.chat_postMessage(text=text, channel=ch_id)
+    sync_app.latest_whinetime_message = await app.client.chat_postMessage(
+        channel=ch_id, blocks=sync_app.whinetime_announcement_blocks(host_id))
+
+
+async def when_whinetime_host(message, direct_msg=False):
+    await reply(message, await run_sync(sync_app.whinetime_host_reply, message), direct_msg=direct_msg)
+
+
+""" ---------- BIRTHDAYS ---------- """
+
+
+async def list_birthdays(message, direct_msg=False):
+    await reply(message, await run_sync(sync_app.birthday_list_reply), direct_msg=direct_msg)
+
+
+async def reply_closest_birthday(message, direct_msg=False):
+    await reply(message, await run_sync(sync_app.closest_birthday_reply), direct_msg=direct_msg)
+
+
+async def reply_happy_birthday(message, direct_msg=False):
+    await reply(message, sync_app.happy_birthday_reply(), direct_msg=direct_msg)
+
+
+async def when_birthday(message, direct_msg=False):
+    await reply(message, await run_sync(sync_app.when_birthday_reply, message), direct_msg=direct_msg)
+
+
+# async versions of the mention actions in ``app.py``
+ASYNC_ACTIONS = {
+    sync_app.when_whinetime_host: when_whinetime_host,
+    sync_app.list_birthdays: list_birthdays,
+    sync_app.reply_closest_birthday: reply_closest_birthday,
+    sync_app.reply_happy_birthday: reply_happy_birthday,
+    sync_app.when_birthday: when_birthday,
+}
+
+
+async def main():
+    await AsyncSocketModeHandler(app, os.environ["SLACK_APP_TOKEN"]).start_async()
+
+
+# start Gerald
+if __name__ == "__main__":
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    scheduler = BackgroundScheduler({'apscheduler.timezone': 'US/Pacific'})
+    scheduler.add_job(sync_app.every_morning, "cron", hour=9, minute=32)
+    scheduler.start()
+    asyncio.run(main())
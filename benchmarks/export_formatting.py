@@ -0,0 +1,100 @@
+"""Benchmark the formatting of channel exports on a synthetic channel
+
+Compares the current formatting in ``archivist`` with the original version (two uncompiled substitutions
+per message and a fresh datetime for every line). Run from the root of the repo with
+
+    python benchmarks/export_formatting.py --n-messages 1000000
+"""
+import argparse
+import datetime
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import archivist    # noqa: E402
+
+
+def original_expand_mentions(text, user_map, channel_map):
+    def replace_user(match):
+        user_id = match.group(1)
+        return user_map.get(user_id, f"<@{user_id}>")
+
+    def replace_channel(match):
+        channel_id = match.group(1)
+        return channel_map.get(channel_id, f"<#{channel_id}>")
+
+    text = re.sub(r"<@([UW][A-Z0-9]+)>", replace_user, text)
+    text = re.sub(r"<#([C][A-Z0-9]+)>", replace_channel, text)
+    return text
+
+
+def original_format_ts(ts_str):
+    ts = float(ts_str.split('.')[0])
+    return datetime.datetime.fromtimestamp(ts, tz=archivist.PACIFIC).strftime("%Y-%m-%d %H:%M")
+
+
+def original_format_record(record, user_map, channel_map):
+    user_id = record.get("user") or "unknown"
+    username = user_map.get(user_id, f"<{user_id}>")
+    text = record.get("text", "").replace("\n", " ")
+    text = original_expand_mentions(text, user_map, channel_map)
+    line = f"{original_format_ts(record['ts'])}: {username}: {text}"
+    return "    → " + line if record["is_reply"] else line
+
+
+def synthetic_channel(n_messages, n_users=50, n_channels=20, seed=42):
+    """Make a list of export records that look roughly like a real channel"""
+    rng = random.Random(seed)
+    user_ids = [f"U{k:08d}" for k in range(n_users)]
+    channel_ids = [f"C{k:08d}" for k in range(n_channels)]
+    words = ["the", "paper", "coffee", "whinetime", "birthday", "galaxy", "code", "bug", "plot", "seminar"]
+
+    ts = 1500000000.0
+    records = []
+    for _ in range(n_messages):
+        # messages come in bursts with occasional long gaps
+        ts += rng.expovariate(1 / 30) if rng.random() < 0.9 else rng.expovariate(1 / 3600)
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(3, 25)))
+        if rng.random() < 0.3:
+            text += f" <@{rng.choice(user_ids)}>"
+        if rng.random() < 0.1:
+            text += f" see <#{rng.choice(channel_ids)}>"
+        records.append({"ts": f"{ts:.6f}", "user": rng.choice(user_ids), "text": text,
+                        "is_reply": rng.random() < 0.2})
+
+    user_map = {user_id: f"@user{k}" for k, user_id in enumerate(user_ids[:-5])}
+    channel_map = {channel_id: f"#channel{k}" for k, channel_id in enumerate(channel_ids[:-2])}
+    return records, user_map, channel_map
+
+
+def time_formatter(formatter, records, user_map, channel_map):
+    start = time.perf_counter()
+    lines = [formatter(record, user_map, channel_map) for record in records]
+    return time.perf_counter() - start, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n-messages", type=int, default=1_000_000, help="number of messages to format")
+    args = parser.parse_args()
+
+    records, user_map, channel_map = synthetic_channel(args.n_messages)
+
+    original_time, original_lines = time_formatter(original_format_record, records, user_map, channel_map)
+    archivist.format_minute.cache_clear()
+    new_time, new_lines = time_formatter(archivist.format_record, records, user_map, channel_map)
+    assert new_lines == original_lines, "formatting has changed!"
+
+    print(f"Formatted {args.n_messages} messages")
+    print(f"  original: {original_time:.2f}s ({args.n_messages / original_time:,.0f} messages/s)")
+    print(f"  current:  {new_time:.2f}s ({args.n_messages / new_time:,.0f} messages/s)")
+    print(f"  speed up: {original_time / new_time:.2f}x")
+    print(f"  timestamp cache: {archivist.format_minute.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark how long it takes to start Gerald (i.e. ``import app``) from a cold interpreter
+
+Each import is timed in a fresh Python process so nothing is cached between runs. Importing ``app`` needs
+``SLACK_BOT_TOKEN`` to be set (Bolt checks the token on startup), but any other module can be timed
+without it. Run from the root of the repo with
+
+    python benchmarks/startup.py --module app --repeats 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# run in a child process: time the import and report the peak memory (ru_maxrss is in KB on Linux)
+CHILD_SCRIPT = """
+import resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, "pandas" in sys.modules,
+      "numpy" in sys.modules)
+"""
+
+
+def time_import(module):
+    """Time a single import of a module in a fresh interpreter
+
+    Parameters
+    ----------
+    module : `str`
+        Name of the module to import
+
+    Returns
+    -------
+    elapsed : `float`
+        Time taken by the import in seconds
+    max_rss : `int`
+        Peak memory use of the process in KB
+    heavy : `list` of `str`
+        Which of pandas and numpy ended up being imported
+    """
+    output = subprocess.run([sys.executable, "-c", CHILD_SCRIPT.format(module=module)], cwd=REPO_DIR,
+                            capture_output=True, text=True, check=True).stdout.split()
+    heavy = [name for name, loaded in zip(["pandas", "numpy"], output[2:]) if loaded == "True"]
+    return float(output[0]), int(output[1]), heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app", help="module to import")
+    parser.add_argument("--repeats", type=int, default=10, help="number of cold imports to time")
+    args = parser.parse_args()
+
+    # warm up the filesystem cache and bytecode so we're only timing the imports themselves
+    time_import(args.module)
+
+    times, memory = [], []
+    for _ in range(args.repeats):
+        elapsed, max_rss, heavy = time_import(args.module)
+        times.append(elapsed)
+        memory.append(max_rss)
+
+    print(f"import {args.module} ({args.repeats} cold starts)")
+    print(f"  median: {statistics.median(times) * 1000:.0f}ms (min {min(times) * 1000:.0f}ms, "
+          f"max {max(times) * 1000:.0f}ms)")
+    print(f"  peak memory: {statistics.median(memory) / 1024:.1f}MB")
+    print(f"  heavy imports: {', '.join(heavy) if len(heavy) > 0 else 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import threading
+import time
+
+from rate_limits import call_with_backoff
+
+
+class WorkspaceDirectory:
+    """A cached copy of the users and channels in the Slack workspace, indexed by both ID and name
+
+    Each half of the directory is fetched (following every page of results) the first time it is needed
+    and then reused until it is older than ``ttl`` or explicitly invalidated.
+
+    Parameters
+    ----------
+    client : `WebClient`
+        Slack client used to fetch the directory
+    ttl : `float`, optional
+        How many seconds to trust the cache for, by default 6 hours
+    """
+    def __init__(self, client, ttl=6 * 60 * 60):
+        self.client = client
+        self.ttl = ttl
+        self.lock = threading.RLock()
+
+        self._user_names, self._user_ids = {}, {}
+        self._channel_names, self._channel_ids = {}, {}
+        self._users_fetched, self._channels_fetched = None, None
+
+    # ---------- USERS ----------
+
+    def username(self, user_id):
+        """Get the username of a user from their ID (None if they don't exist)"""
+        self._ensure_users()
+        return self._user_names.get(user_id)
+
+    def user_id(self, username):
+        """Get the ID of a user from their username (None if they don't exist)"""
+        self._ensure_users()
+        return self._user_ids.get(username)
+
+    def user_names(self):
+        """Get a copy of the full dictionary of user ID -> username"""
+        self._ensure_users()
+        return dict(self._user_names)
+
+    def update_user(self, user):
+        """Add or update a single user (e.g. from a ``user_change`` or ``team_join`` event)"""
+        with self.lock:
+            old_name = self._user_names.get(user["id"])
+            if old_name is not None and self._user_ids.get(old_name) == user["id"]:
+                del self._user_ids[old_name]
+            self._user_names[user["id"]] = user["name"]
+            self._user_ids[user["name"]] = user["id"]
+
+    def invalidate_users(self):
+        """Forget the users so that they are fetched again next time they are needed"""
+        with self.lock:
+            self._users_fetched = None
+
+    def _ensure_users(self):
+        with self.lock:
+            if self._users_fetched is not None and time.monotonic() - self._users_fetched < self.ttl:
+                return
+            user_names = {}
+            for page in self._pages(self.client.users_list, limit=200):
+                for user in page["members"]:
+                    user_names[user["id"]] = user["name"]
+            self._user_names = user_names
+            self._user_ids = {name: user_id for user_id, name in user_names.items()}
+            self._users_fetched = time.monotonic()
+
+    # ---------- CHANNELS ----------
+
+    def channel_name(self, channel_id):
+        """Get the name of a channel from its ID (None if it doesn't exist)"""
+        self._ensure_channels()
+        return self._channel_names.get(channel_id)
+
+    def channel_id(self, channel_name):
+        """Get the ID of a channel from its name (None if it doesn't exist)"""
+        self._ensure_channels()
+        return self._channel_ids.get(channel_name)
+
+    def channel_names(self):
+        """Get a copy of the full dictionary of channel ID -> channel name"""
+        self._ensure_channels()
+        return dict(self._channel_names)
+
+    def update_channel(self, channel_id, channel_name):
+        """Add or rename a single channel (e.g. from a ``channel_rename`` event)"""
+        with self.lock:
+            old_name = self._channel_names.get(channel_id)
+            if old_name is not None and self._channel_ids.get(old_name) == channel_id:
+                del self._channel_ids[old_name]
+            self._channel_names[channel_id] = channel_name
+            self._channel_ids[channel_name] = channel_id
+
+    def invalidate_channels(self):
+        """Forget the channels so that they are fetched again next time they are needed"""
+        with self.lock:
+            self._channels_fetched = None
+
+    def _ensure_channels(self):
+        with self.lock:
+            if self._channels_fetched is not None and time.monotonic() - self._channels_fetched < self.ttl:
+                return
+            channel_names = {}
+            for page in self._pages(self.client.conversations_list, types="public_channel,private_channel",
+                                    exclude_archived=True, limit=1000):
+                for channel in page["channels"]:
+                    channel_names[channel["id"]] = channel["name"]
+            self._channel_names = channel_names
+            self._channel_ids = {name: channel_id for channel_id, name in channel_names.items()}
+            self._channels_fetched = time.monotonic()
+
+    def _pages(self, method, **kwargs):
+        """Yield every page of a paginated Slack API method"""
+        cursor = None
+        while True:
+            page = call_with_backoff(method, cursor=cursor, **kwargs)
+            yield page
+            cursor = page.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                break
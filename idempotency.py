@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class RecentEvents:
+    """A bounded record of what we've already done for recent events and messages
+
+    Each key (e.g. an event ID or a ``(channel, ts)`` pair for a message) maps to the set of things that
+    have been done for it, so that retried events can be skipped and an edited message only triggers things
+    that it didn't trigger the first time. Keys are forgotten once they are older than ``ttl`` or, if there
+    are more than ``max_size`` of them, least recently used first.
+
+    Parameters
+    ----------
+    max_size : `int`, optional
+        Maximum number of keys to remember, by default 10000
+    ttl : `float`, optional
+        How many seconds to remember each key for, by default 24 hours
+    """
+    def __init__(self, max_size=10000, ttl=24 * 60 * 60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self._done = OrderedDict()
+
+    def claim(self, key, actions):
+        """Claim some actions for a key, getting back only the ones that haven't been claimed before
+
+        Parameters
+        ----------
+        key : `hashable`
+            Key of the event or message (if this is None then nothing is remembered and every action is new)
+        actions : `list`
+            Actions to claim (anything hashable)
+
+        Returns
+        -------
+        new_actions : `list`
+            The actions that hadn't already been claimed for this key (in the same order)
+        """
+        actions = list(dict.fromkeys(actions))
+        if key is None:
+            return actions
+
+        with self.lock:
+            now = time.monotonic()
+            self._expire(now)
+
+            # move the key to the end as it is now the most recently used
+            _, done = self._done.pop(key, (now, set()))
+            self._done[key] = (now, done)
+
+            new_actions = [action for action in actions if action not in done]
+            done.update(new_actions)
+
+            while len(self._done) > self.max_size:
+                self._done.popitem(last=False)
+        return new_actions
+
+    def first_time(self, key, action="seen"):
+        """Check whether this is the first time we've seen a key (and remember that we have now)"""
+        return len(self.claim(key, [action])) > 0
+
+    def _expire(self, now):
+        # everything is in order of last use so stop at the first key that is still fresh
+        while len(self._done) > 0:
+            key, (last_used, _) = next(iter(self._done.items()))
+            if now - last_used <= self.ttl:
+                break
+            del self._done[key]
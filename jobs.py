@@ -0,0 +1,207 @@
+import itertools
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Job:
+    """A long-running action that is being run in the background
+
+    Parameters
+    ----------
+    client : `WebClient`
+        Slack client used to report progress
+    job_id : `str`
+        Unique ID of the job (e.g. "export-3")
+    name : `str`
+        Name of the type of job (e.g. "export")
+    user : `str`, optional
+        ID of the user that started the job, by default None
+    channel : `str`, optional
+        ID of the channel that the job was started from, by default None
+    thread_ts : `str`, optional
+        Timestamp of the thread to report progress in, by default None
+    """
+    def __init__(self, client, job_id, name, user=None, channel=None, thread_ts=None):
+        self.client = client
+        self.id = job_id
+        self.name = name
+        self.user = user
+        self.channel = channel
+        self.thread_ts = thread_ts
+        self.cancel_event = threading.Event()
+        self.started = None
+        self.status = None
+        self.status_ts = None
+        self.future = None
+
+    @property
+    def cancelled(self):
+        """Whether someone has asked for this job to be cancelled"""
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        """Ask the job to stop (it is up to the job to check `cancelled` and stop at a sensible point)"""
+        self.cancel_event.set()
+
+    def set_status(self, text):
+        """Record how far the job has got (shown when listing jobs, without posting anything)"""
+        self.status = text
+
+    def post_status(self, text):
+        """Record how far the job has got and show it in the thread that started the job, editing the same
+        message each time rather than posting a new one (or printing it if there isn't a thread)"""
+        self.set_status(text)
+        if self.channel is None:
+            print(f"[{self.id}] {text}")
+        elif self.status_ts is None:
+            response = self.client.chat_postMessage(text=text, channel=self.channel, thread_ts=self.thread_ts)
+            self.status_ts = response["ts"]
+        else:
+            self.client.chat_update(text=text, channel=self.channel, ts=self.status_ts)
+
+    def progress(self, text):
+        """Report some progress in the thread that started the job (or the logs if there isn't one)"""
+        if self.channel is None:
+            print(f"[{self.id}] {text}")
+        else:
+            self.client.chat_postMessage(text=text, channel=self.channel, thread_ts=self.thread_ts)
+
+
+class JobRunner:
+    """Runs long actions on a bounded pool of background threads so they never hold up message handling
+
+    Functions run as jobs can get their own `Job` with :meth:`current_job` to report progress (with
+    `Job.set_status`, `Job.post_status` or `Job.progress`) and check whether they've been cancelled.
+
+    Parameters
+    ----------
+    client : `WebClient`
+        Slack client used to report progress
+    max_workers : `int`, optional
+        Maximum number of jobs running at once (any more are queued), by default 4
+    max_per_user : `int`, optional
+        Maximum number of jobs that a single user can have running or queued, by default 2
+    """
+    def __init__(self, client, max_workers=4, max_per_user=2):
+        self.client = client
+        self.max_workers = max_workers
+        self.max_per_user = max_per_user
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.lock = threading.Lock()
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+
+    def submit(self, name, func, *args, user=None, channel=None, thread_ts=None, **kwargs):
+        """Run a function as a background job
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the type of job (e.g. "export")
+        func : `function`
+            Function to run
+        *args
+            Arguments to pass to the function
+        user : `str`, optional
+            ID of the user that started the job, by default None
+        channel : `str`, optional
+            ID of the channel that the job was started from, by default None
+        thread_ts : `str`, optional
+            Timestamp of the thread to report progress in, by default None
+        **kwargs
+            Keyword arguments to pass to the function
+
+        Returns
+        -------
+        job : `Job`
+            The new job (None if the user already has too many jobs)
+        """
+        with self.lock:
+            # don't let one person hog every worker
+            users_jobs = [job.id for job in self._jobs.values() if user is not None and job.user == user]
+            if len(users_jobs) >= self.max_per_user:
+                job = None
+            else:
+                job = Job(self.client, f"{name}-{next(self._ids)}", name,
+                          user=user, channel=channel, thread_ts=thread_ts)
+                self._jobs[job.id] = job
+                n_ahead = len(self._jobs) - 1
+
+        if job is None:
+            if channel is not None:
+                self.client.chat_postMessage(text=(f"Woah there, you've already got {len(users_jobs)} jobs "
+                                                   f"on the go ({', '.join(users_jobs)}) - let one of those "
+                                                   "finish (or cancel it) before asking for more "
+                                                   ":gerald-confused:"),
+                                             channel=channel, thread_ts=thread_ts)
+            return None
+
+        # let them know if they have to wait their turn
+        if n_ahead >= self.max_workers:
+            job.progress(f"I'm a little busy right now so your job ({job.id}) is in the queue, I'll get to "
+                         "it as soon as I can!")
+
+        job.future = self.pool.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def current_job(self):
+        """Get the job running in this thread (None if this isn't a job thread)"""
+        return getattr(self._local, "job", None)
+
+    def active_jobs(self):
+        """Get a list of every job that is running or queued"""
+        with self.lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id=None, name=None, channel=None, user=None):
+        """Cancel every running or queued job that matches all of the given filters
+
+        Parameters
+        ----------
+        job_id : `str`, optional
+            ID of the job, by default None (any ID)
+        name : `str`, optional
+            Name of the type of job, by default None (any type)
+        channel : `str`, optional
+            ID of the channel the job was started from, by default None (any channel)
+        user : `str`, optional
+            ID of the user that started the job, by default None (any user)
+
+        Returns
+        -------
+        cancelled : `list` of `Job`
+            The jobs that were cancelled
+        """
+        cancelled = []
+        for job in self.active_jobs():
+            if (job_id is None or job.id == job_id) and (name is None or job.name == name) \
+                    and (channel is None or job.channel == channel) and (user is None or job.user == user):
+                job.cancel()
+                cancelled.append(job)
+        return cancelled
+
+    def shutdown(self, wait=True):
+        """Cancel every job and stop the pool"""
+        for job in self.active_jobs():
+            job.cancel()
+        self.pool.shutdown(wait=wait)
+
+    def _run(self, job, func, args, kwargs):
+        self._local.job = job
+        try:
+            # it might have been cancelled while in the queue
+            if job.cancelled:
+                return None
+            job.started = time.monotonic()
+            return func(*args, **kwargs)
+        except Exception as e:
+            print(f"WARNING: job {job.id} failed")
+            traceback.print_exc()
+            job.progress(f"Sorry, something went wrong with that job ({job.id}): {e} :gerald-deceased:")
+        finally:
+            self._local.job = None
+            with self.lock:
+                self._jobs.pop(job.id, None)
@@ -0,0 +1,25 @@
+def first_initial_and_last_name(name):
+    """Split a full name (e.g. "Tom Wagg") into its first initial and last name (e.g. ("T", "Wagg"))"""
+    split_name = name.split(" ")
+    return split_name[0][0], split_name[-1]
+
+
+def author_query(name, orcid=None):
+    """Create a simple ADS query for a person, using their ORCID ID if we have it or else their name
+
+    Parameters
+    ----------
+    name : `str`
+        Full name of the person
+    orcid : `str`, optional
+        ORCID ID of the person, by default None
+
+    Returns
+    -------
+    query : `str`
+        ADS query
+    """
+    if orcid is not None:
+        return f'orcid:{orcid}'
+    first_initial, last_name = first_initial_and_last_name(name)
+    return f'author:"{last_name}, {first_initial}"'
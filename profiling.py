@@ -0,0 +1,52 @@
+import re
+import subprocess
+import sys
+
+# each line of ``python -X importtime`` looks like "import time:  self | cumulative |   package" where the
+# package is indented by two spaces for each level of nesting
+IMPORTTIME_REGEX = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def profile_imports(module="app", n_top=10, cwd=None):
+    """Time importing a module in a fresh interpreter with ``python -X importtime``
+
+    Parameters
+    ----------
+    module : `str`, optional
+        Module to import, by default "app"
+    n_top : `int`, optional
+        Number of the slowest imports to return, by default 10
+    cwd : `str`, optional
+        Directory to run the import from, by default None (the current directory)
+
+    Returns
+    -------
+    total : `float`
+        Time taken to import the module in seconds
+    slowest : `list` of `tuples`
+        Each tuple is (name, seconds) for the ``n_top`` slowest imports made directly by the module, sorted
+        slowest first (the times include everything that they import in turn)
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=cwd,
+                            capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed: {result.stderr.strip().splitlines()[-1]}")
+
+    # read the (depth, name, cumulative time) of every import
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_REGEX.match(line)
+        if match is not None:
+            imports.append((len(match.group(3)) // 2, match.group(4), int(match.group(2)) / 1e6))
+
+    # imports are listed after everything they import, so find the module and then step back through its
+    # direct imports until we reach the previous top-level import
+    end = max(i for i, (depth, name, _) in enumerate(imports) if depth == 0 and name == module)
+    direct = []
+    for depth, name, cumulative in reversed(imports[:end]):
+        if depth == 0:
+            break
+        if depth == 1:
+            direct.append((name, cumulative))
+
+    return imports[end][2], sorted(direct, key=lambda item: item[1], reverse=True)[:n_top]
@@ -1,11 +1,204 @@
+import csv
 import datetime
-import pandas as pd
+import os
+import random
+import sqlite3
+import threading
+from collections import deque
+
+# quotes can't be picked again until this many days after they were last used
+COOLDOWN_DAYS = 100
+
+# the last used date of a quote that has never been picked
+NEVER_USED = "1900-01-01"
+
+
+class QuoteStore:
+    """The archive of quotes, stored in an SQLite database with an index on when each was last used
+
+    Adding a quote is a single insert and picking one is a single transaction, so neither has to rewrite
+    the whole archive. The first time the database is opened, any quotes in the old pipe-separated CSV
+    file are copied over.
+
+    Picking is done from memory: quotes that can be picked are kept in an unordered list (so a random one
+    can be taken out in constant time by swapping it with the last) and quotes that have been used recently
+    wait in a queue ordered by when they were last used, moving back to the list once they cool down.
+
+    Parameters
+    ----------
+    path : `str`, optional
+        Path to the database file, by default "private_data/quotes.db"
+    csv_path : `str`, optional
+        Path to the old CSV file to migrate from, by default "private_data/quotes.csv"
+    """
+    def __init__(self, path="private_data/quotes.db", csv_path="private_data/quotes.csv"):
+        self.path = path
+        self.csv_path = csv_path
+        self.lock = threading.Lock()
+        self.connection = None
+        self._eligible = None
+        self._cooldown = None
+
+    def _connect(self):
+        # only open the database the first time we need it
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS quotes (id INTEGER PRIMARY KEY, "
+                                    "quote TEXT NOT NULL, person TEXT NOT NULL, last_used TEXT NOT NULL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS quotes_last_used ON quotes (last_used)")
+
+            # user_version starts at 0 so we use it to remember whether we've migrated the CSV
+            if self.connection.execute("PRAGMA user_version").fetchone()[0] == 0:
+                self._migrate_csv()
+        return self.connection
+
+    def _migrate_csv(self):
+        rows = read_quotes_csv(self.csv_path) if os.path.exists(self.csv_path) else []
+        with self.connection:
+            self.connection.executemany("INSERT INTO quotes (quote, person, last_used) VALUES (?, ?, ?)",
+                                        rows)
+            self.connection.execute("PRAGMA user_version = 1")
+        if len(rows) > 0:
+            print(f"Copied {len(rows)} quotes from {self.csv_path} to {self.path}")
+
+    def _load(self, today):
+        # only read the quotes the first time we need them, after that memory is kept in sync with the db
+        if self._eligible is None:
+            rows = self._connect().execute("SELECT last_used, id, quote, person FROM quotes "
+                                           "ORDER BY last_used").fetchall()
+            self._eligible = []
+            self._cooldown = deque(rows)
+        self._release(today)
+
+    def _release(self, today):
+        # move any quotes that have cooled down from the front of the queue to the pool
+        cutoff = cooldown_cutoff(today)
+        while len(self._cooldown) > 0 and self._cooldown[0][0] < cutoff:
+            _, quote_id, quote, person = self._cooldown.popleft()
+            self._eligible.append((quote_id, quote, person))
+
+    def add(self, quote, person):
+        """Add a new (never used) quote to the archive"""
+        with self.lock:
+            connection = self._connect()
+            with connection:
+                cursor = connection.execute("INSERT INTO quotes (quote, person, last_used) VALUES (?, ?, ?)",
+                                            (quote, person, NEVER_USED))
+            if self._eligible is not None:
+                self._eligible.append((cursor.lastrowid, quote, person))
+
+    def pick(self, today=None):
+        """Pick a random quote that hasn't been used recently and mark it as used today
+
+        Parameters
+        ----------
+        today : `datetime.date`, optional
+            Today's date, by default None (the actual date)
+
+        Returns
+        -------
+        quote, person : `str`
+            The quote and who said it (both None if every quote has been used recently)
+        """
+        today = datetime.date.today() if today is None else today
+        with self.lock:
+            self._load(today)
+            if len(self._eligible) == 0:
+                return None, None
+
+            # save it to the db first so memory doesn't change if that fails
+            index = random.randrange(len(self._eligible))
+            quote_id, quote, person = self._eligible[index]
+            connection = self._connect()
+            with connection:
+                connection.execute("UPDATE quotes SET last_used = ? WHERE id = ?",
+                                   (today.isoformat(), quote_id))
+
+            # swap with the last quote so removing it is O(1), then it goes to the back of the queue
+            self._eligible[index] = self._eligible[-1]
+            self._eligible.pop()
+            self._cooldown.append((today.isoformat(), quote_id, quote, person))
+        return quote, person
+
+    def weeks_remaining(self, first_pick, max_weeks=4):
+        """Work out how many weekly quotes are left, counting quotes that will have cooled down in time
+
+        Parameters
+        ----------
+        first_pick : `datetime.date`
+            Date of the next pick
+        max_weeks : `int`, optional
+            Stop counting after this many weeks, by default 4
+
+        Returns
+        -------
+        weeks : `int`
+            Number of weeks in a row (up to ``max_weeks``) that will have a quote
+        """
+        with self.lock:
+            self._load(datetime.date.today())
+            n_available = len(self._eligible)
+            n_waiting = 0
+            for week in range(max_weeks):
+                # count the quotes that will have cooled down by this pick (the queue is in order)
+                cutoff = cooldown_cutoff(first_pick + datetime.timedelta(weeks=week))
+                while n_waiting < len(self._cooldown) and self._cooldown[n_waiting][0] < cutoff:
+                    n_waiting += 1
+
+                # quotes picked before this week won't be back for a while so they are just used up
+                if n_available + n_waiting - week <= 0:
+                    return week
+        return max_weeks
+
+
+def cooldown_cutoff(today):
+    """Get the (ISO) date that quotes must have been last used before to be picked today"""
+    return (today - datetime.timedelta(days=COOLDOWN_DAYS)).isoformat()
+
+
+def read_quotes_csv(path):
+    """Read the quotes from the old pipe-separated CSV file
+
+    Over time the file picked up extra index columns from being rewritten, so only the quote, person and
+    date columns are used (and dates are trimmed to just the day).
+
+    Parameters
+    ----------
+    path : `str`
+        Path to the file
+
+    Returns
+    -------
+    rows : `list` of `tuples`
+        Each tuple is (quote, person, last_used)
+    """
+    rows = []
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f, delimiter="|"):
+            rows.append((row["quote"], row["person"], parse_day(row.get("date"))))
+    return rows
+
+
+def parse_day(date):
+    """Convert a date (with or without a time) to an ISO day, using `NEVER_USED` if it isn't valid"""
+    try:
+        return datetime.date.fromisoformat((date or "").strip()[:10]).isoformat()
+    except ValueError:
+        return NEVER_USED
+
+
+QUOTE_STORE = QuoteStore()
+
+
+def is_quote(text):
+    """Check whether a message is a quote (i.e. it starts with a block quote)"""
+    return text[:4] == "&gt;"
 
 
 def save_quote(text):
     """Save a quote to file given a message"""
     # check if the message is a quote
-    if text[:4] == "&gt;":
+    if is_quote(text):
         # remove the quote symbols and quotation marks
         text = text.replace("&gt;", "").replace("\"", "").replace("“", "").replace("”", "")
 
@@ -13,32 +206,15 @@ def save_quote(text):
         the_quote, the_person = text.split("-")
         the_quote, the_person = the_quote.strip(), the_person.strip()
 
-        # append the quote to the quotes file
-        quotes = pd.read_csv("private_data/quotes.csv", sep="|")
-        quotes.append({'quote': the_quote,
-                       'person': the_person,
-                       'date': pd.Timestamp("1900-01-01")},
-                      ignore_index=True).reset_index().to_csv("private_data/quotes.csv",
-                                                              sep="|", index=False)
+        # add the quote to the archive
+        QUOTE_STORE.add(the_quote, the_person)
 
 
 def pick_random_quote():
-    quotes = pd.read_csv("private_data/quotes.csv", sep="|")
-
-    # find which quotes have not been used in the last 100 days
-    today = datetime.date.today()
-    unrecent_quotes = pd.to_datetime(quotes["date"]) < (pd.Timestamp(today) - pd.Timedelta(days=100))
-
-    # if all quotes have been used in the last 100 days, return None
-    if unrecent_quotes.sum() == 0:
-        return None, None
-
-    # pick a random quote from the unrecent quotes
-    random_quote = quotes[unrecent_quotes].sample(1)
+    """Pick a random quote that hasn't been used in the last 100 days (None, None if there aren't any)"""
+    return QUOTE_STORE.pick()
 
-    # update the quote date to today
-    quotes.loc[random_quote.index, "date"] = pd.Timestamp(today)
-    quotes.to_csv("private_data/quotes.csv", sep="|")
 
-    # return the quote and person
-    return random_quote["quote"].values[0], random_quote["person"].values[0]
+def weeks_of_quotes_left(first_pick, max_weeks=4):
+    """Count how many weeks of quotes are left (up to ``max_weeks``) starting from ``first_pick``"""
+    return QUOTE_STORE.weeks_remaining(first_pick, max_weeks=max_weeks)
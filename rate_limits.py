@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+from slack_sdk.errors import SlackApiError
+
+
+class TokenBucket:
+    """A token bucket rate limiter that can be shared between threads
+
+    Parameters
+    ----------
+    rate : `float`
+        How many tokens are added to the bucket each second (i.e. the sustained request rate)
+    capacity : `int`
+        Maximum number of tokens in the bucket (i.e. how big a burst of requests can be)
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token from the bucket, waiting until one is available if needed"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Empty the bucket so that no requests are made for a while (e.g. after a ``Retry-After``)"""
+        with self.lock:
+            self.tokens = -seconds * self.rate
+            self.updated = time.monotonic()
+
+
+def retry_after(response, default=1):
+    """Work out how long Slack has asked us to wait before trying again
+
+    Parameters
+    ----------
+    response : `SlackResponse`
+        Response to a rate-limited request
+    default : `int`, optional
+        Number of seconds to wait if there is no ``Retry-After`` header, by default 1
+
+    Returns
+    -------
+    delay : `int`
+        Number of seconds to wait
+    """
+    for key, value in response.headers.items():
+        if key.lower() == "retry-after":
+            # depending on the HTTP client the header can be a single value or a list of them
+            if isinstance(value, (list, tuple)):
+                value = value[0]
+            return int(value)
+    return default
+
+
+def call_with_backoff(method, max_retries=5, limiter=None, **kwargs):
+    """Call a Slack API method, waiting and retrying whenever we are rate limited (HTTP 429)
+
+    Parameters
+    ----------
+    method : `function`
+        Slack client method (e.g. ``app.client.reactions_add``)
+    max_retries : `int`, optional
+        How many times to retry after a rate limit before giving up, by default 5
+    limiter : `TokenBucket`, optional
+        Rate limiter to take a token from before each attempt, by default None
+    **kwargs
+        Arguments to pass to the method
+
+    Returns
+    -------
+    response : `SlackResponse`
+        Response from the final successful call
+
+    Raises
+    ------
+    SlackApiError
+        If the call fails for a reason other than rate limits or we run out of retries
+    """
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return method(**kwargs)
+        except SlackApiError as e:
+            if e.response.status_code != 429 or attempt == max_retries:
+                raise
+            delay = retry_after(e.response)
+
+            # hold back every other thread sharing the limiter too
+            if limiter is not None:
+                limiter.pause(delay)
+            else:
+                time.sleep(delay)
+
+
+async def async_call_with_backoff(method, max_retries=5, **kwargs):
+    """Call an async Slack API method, waiting (without blocking the event loop) and retrying whenever we
+    are rate limited (HTTP 429)
+
+    Parameters
+    ----------
+    method : `coroutine function`
+        Async Slack client method (e.g. ``app.client.reactions_add`` for an ``AsyncApp``)
+    max_retries : `int`, optional
+        How many times to retry after a rate limit before giving up, by default 5
+    **kwargs
+        Arguments to pass to the method
+
+    Returns
+    -------
+    response : `AsyncSlackResponse`
+        Response from the final successful call
+
+    Raises
+    ------
+    SlackApiError
+        If the call fails for a reason other than rate limits or we run out of retries
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return await method(**kwargs)
+        except SlackApiError as e:
+            if e.response.status_code != 429 or attempt == max_retries:
+                raise
+            await asyncio.sleep(retry_after(e.response))
@@ -0,0 +1,72 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from slack_sdk.errors import SlackApiError
+
+from rate_limits import call_with_backoff
+
+
+class ReactionDispatcher:
+    """Send reactions to Slack from a bounded pool of worker threads so that event handlers don't wait on
+    them. Reactions for a message are sent concurrently, rate limits are respected through the
+    ``Retry-After`` header and duplicate reactions are merged.
+
+    Parameters
+    ----------
+    client : `WebClient`
+        Slack client used to add the reactions
+    max_workers : `int`, optional
+        Maximum number of reactions being sent at once, by default 4
+    """
+    def __init__(self, client, max_workers=4):
+        self.client = client
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reactions")
+
+        # (channel, ts, name) of every reaction queued or being sent right now
+        self.pending = set()
+        self.lock = threading.Lock()
+
+    def react(self, channel, ts, reactions):
+        """Queue up some reactions to a message
+
+        Parameters
+        ----------
+        channel : `str`
+            ID of the channel containing the message
+        ts : `str`
+            Timestamp of the message
+        reactions : `list` of `str`
+            Names of the emojis to react with
+
+        Returns
+        -------
+        futures : `list` of `Future`
+            One future for each reaction that was actually queued (duplicates are dropped)
+        """
+        futures = []
+        with self.lock:
+            # dict.fromkeys removes duplicates but keeps the order
+            for name in dict.fromkeys(reactions):
+                key = (channel, ts, name)
+                if key in self.pending:
+                    continue
+                self.pending.add(key)
+                futures.append(self.pool.submit(self._add_reaction, key))
+        return futures
+
+    def _add_reaction(self, key):
+        channel, ts, name = key
+        try:
+            call_with_backoff(self.client.reactions_add, channel=channel, timestamp=ts, name=name)
+        except SlackApiError as e:
+            # we're on a worker thread so there's no one to raise to, just shout about it instead
+            if e.response["error"] == "invalid_name":
+                print(f"WARNING: no such emoji '{name}'")
+            elif e.response["error"] not in ("no_reaction", "already_reacted"):
+                print(f"WARNING: failed to add reaction '{name}' after retries:", e)
+        finally:
+            with self.lock:
+                self.pending.discard(key)
+
+    def shutdown(self, wait=True):
+        """Stop accepting new reactions, optionally waiting for queued ones to finish"""
+        self.pool.shutdown(wait=wait)
@@ -0,0 +1,159 @@
+import datetime
+import os
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from names import author_query
+
+
+@dataclass(frozen=True)
+class Grad:
+    """A single grad from the roster file"""
+    name: str
+    username: str
+    slack_id: Optional[str]
+    birthday: Optional[Tuple[int, int]]
+    orcid: Optional[str]
+    custom_query: Optional[str]
+
+    @property
+    def ads_query(self):
+        """ADS query for this grad, defaulting to a simple ORCID/name query depending on what's available"""
+        if self.custom_query is not None:
+            return self.custom_query
+        return author_query(self.name, self.orcid)
+
+
+def parse_grad(line):
+    """Parse a single line of the roster file into a `Grad`
+
+    Lines look like ``name|username|slack_id|day/month|orcid|ads_query`` where any missing value is a "-".
+
+    Parameters
+    ----------
+    line : `str`
+        Line from the file
+
+    Returns
+    -------
+    grad : `Grad`
+        Parsed grad
+    """
+    values = [value.strip() for value in line.split("|")]
+    name, username, slack_id, birthday, orcid, query = [None if value in ("", "-") else value
+                                                        for value in values]
+    if birthday is not None:
+        day, month = map(int, birthday.split("/"))
+        birthday = (month, day)
+    return Grad(name=name, username=username, slack_id=slack_id, birthday=birthday,
+                orcid=orcid, custom_query=query)
+
+
+class Roster:
+    """The list of grads in ``private_data/grad_info.csv``, parsed once and indexed for quick lookups
+
+    The file is only read again when its modification time changes.
+
+    Parameters
+    ----------
+    path : `str`, optional
+        Path to the roster file, by default "private_data/grad_info.csv"
+    """
+    def __init__(self, path="private_data/grad_info.csv"):
+        self.path = path
+        self.lock = threading.Lock()
+        self._mtime = None
+        self._grads = []
+        self._by_username, self._by_slack_id, self._by_orcid, self._by_birthday = {}, {}, {}, {}
+        self._birthdays = []
+
+    def grads(self):
+        """Get every grad, in the same order as the file"""
+        self._ensure_loaded()
+        return list(self._grads)
+
+    def by_username(self, username):
+        """Get a grad by their Slack username (None if they aren't in the roster)"""
+        self._ensure_loaded()
+        return self._by_username.get(username)
+
+    def by_slack_id(self, slack_id):
+        """Get a grad by their Slack ID (None if they aren't in the roster)"""
+        self._ensure_loaded()
+        return self._by_slack_id.get(slack_id)
+
+    def by_orcid(self, orcid):
+        """Get a grad by their ORCID ID (None if they aren't in the roster)"""
+        self._ensure_loaded()
+        return self._by_orcid.get(orcid)
+
+    def by_birthday(self, month, day):
+        """Get a list of every grad with a birthday on a particular day"""
+        self._ensure_loaded()
+        return list(self._by_birthday.get((month, day), []))
+
+    def next_birthday(self, today):
+        """Find the next birthday on or after a date (looking up to a year ahead)
+
+        Parameters
+        ----------
+        today : `datetime.date`
+            Date to start looking from
+
+        Returns
+        -------
+        day : `datetime.date`
+            Date of the next birthday (None if there are no birthdays in the next year)
+        grads : `list` of `Grad`
+            Every grad with a birthday on that day
+        """
+        self._ensure_loaded()
+        birthdays = self._birthdays
+
+        # the birthdays are sorted by (month, day) so start from today's and wrap around into next year
+        start = bisect_left(birthdays, (today.month, today.day))
+        candidates = [(today.year, key) for key in birthdays[start:]]
+        candidates += [(today.year + 1, key) for key in birthdays]
+        for year, (month, day) in candidates:
+            try:
+                date = datetime.date(year, month, day)
+            except ValueError:
+                # 29th February outside of a leap year
+                continue
+            if (date - today).days > 365:
+                break
+            return date, list(self._by_birthday[(month, day)])
+        return None, []
+
+    def _ensure_loaded(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        with self.lock:
+            if mtime == self._mtime:
+                return
+
+            grads = []
+            with open(self.path) as grad_file:
+                for line in grad_file:
+                    # ignore any comment or blank lines
+                    if line.strip() == "" or line[0] == "#":
+                        continue
+                    try:
+                        grads.append(parse_grad(line))
+                    except ValueError:
+                        print(f"WARNING: couldn't parse line in {self.path}: {line.rstrip()}")
+
+            # build each of the indices
+            by_birthday = {}
+            for grad in grads:
+                if grad.birthday is not None:
+                    by_birthday.setdefault(grad.birthday, []).append(grad)
+
+            self._grads = grads
+            self._by_username = {grad.username: grad for grad in grads}
+            self._by_slack_id = {grad.slack_id: grad for grad in grads if grad.slack_id is not None}
+            self._by_orcid = {grad.orcid: grad for grad in grads if grad.orcid is not None}
+            self._by_birthday = by_birthday
+            self._birthdays = sorted(by_birthday)
+            self._mtime = mtime
@@ -0,0 +1,49 @@
+import ads_query
+
+
+def raw_paper(bibcode, authors, doctype="article"):
+    """Make the raw fields of an ADS result"""
+    return {"bibcode": bibcode, "title": [bibcode], "author": authors, "doctype": doctype,
+            "pubdate": "2022-01-00"}
+
+
+def test_truncated_batch_requeries_crowded_out_people(monkeypatch):
+    # the batch is full (3 results for rows=3) but one of them is filtered out by its type and Bob has none
+    results = [raw_paper("A1", ["Smith, Alice"]), raw_paper("A2", ["Smith, Alice"]),
+               raw_paper("A3", ["Smith, Alice"], doctype="abstract")]
+    single_queries = []
+    monkeypatch.setattr(ads_query, "search_ads", lambda query, **kwargs: results)
+    monkeypatch.setattr(ads_query, "get_ads_papers",
+                        lambda query, **kwargs: single_queries.append(query) or [{"link": "B1"}])
+
+    papers = ads_query.get_ads_papers_batch([("Alice Smith", None), ("Bob Jones", None)], rows=3)
+
+    assert [paper["title"] for paper in papers[0]] == ["A1", "A2"]
+    assert papers[1] == [{"link": "B1"}]
+    assert single_queries == ['author:"Jones, B"']
+
+
+def test_full_batch_is_not_requeried(monkeypatch):
+    results = [raw_paper("A1", ["Smith, Alice"])]
+    monkeypatch.setattr(ads_query, "search_ads", lambda query, **kwargs: results)
+    monkeypatch.setattr(ads_query, "get_ads_papers", lambda query, **kwargs: 1 / 0)
+
+    papers = ads_query.get_ads_papers_batch([("Alice Smith", None), ("Bob Jones", None)], rows=3)
+
+    assert len(papers[0]) == 1
+    assert papers[1] == []
+
+
+def test_batch_limit_sizes_rows_and_trims_each_person(monkeypatch):
+    results = [raw_paper(f"A{i}", ["Smith, Alice"]) for i in range(3)] + [raw_paper("B1", ["Jones, Bob"])]
+    searches = []
+    monkeypatch.setattr(ads_query, "search_ads",
+                        lambda query, **kwargs: searches.append(kwargs) or results)
+
+    papers = ads_query.get_ads_papers_batch([("Alice Smith", None), ("Bob Jones", None)], limit=2,
+                                            with_abstracts=False)
+
+    assert [paper["title"] for paper in papers[0]] == ["A0", "A1"]
+    assert [paper["title"] for paper in papers[1]] == ["B1"]
+    assert searches[0]["rows"] == ads_query.page_size(4)
+    assert "abstract" not in searches[0]["fl"]
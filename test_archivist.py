@@ -0,0 +1,133 @@
+import json
+import threading
+
+import pytest
+
+import archivist
+from rate_limits import TokenBucket
+
+USER_MAP = {"U1": "@alice", "U2": "@bob"}
+CHANNEL_MAP = {"C9": "#random"}
+
+
+class FakeClient:
+    """A channel of ``n`` messages a minute apart (every third a thread with ``n_replies`` replies)
+
+    If ``cancel_after`` is given then ``cancel_event`` is set once that many threads have been fetched.
+    """
+    def __init__(self, n, n_replies=2, page=10, cancel_after=None):
+        self.n, self.n_replies, self.page = n, n_replies, page
+        self.cancel_after = cancel_after
+        self.cancel_event = threading.Event()
+        self.n_replies_calls = 0
+        self.lock = threading.Lock()
+        self.posts = []
+
+    def chat_postMessage(self, text, **kwargs):
+        self.posts.append(text)
+        return {"ts": "1.0"}
+
+    def files_upload_v2(self, **kwargs):
+        pass
+
+    def conversations_history(self, channel, limit, cursor=None, oldest=None, latest=None):
+        messages = []
+        for i in reversed(range(self.n)):
+            ts = f"{1700000000 + i * 60}.000100"
+            if (oldest is not None and float(ts) <= float(oldest)) \
+                    or (latest is not None and float(ts) >= float(latest)):
+                continue
+            message = {"ts": ts, "user": "U1", "text": f"message {i} for <@U2> in <#C9>"}
+            if i % 3 == 0:
+                message.update(thread_ts=ts, reply_count=self.n_replies)
+            messages.append(message)
+        start = int(cursor or 0)
+        next_cursor = str(start + self.page) if start + self.page < len(messages) else ""
+        return {"messages": messages[start:start + self.page],
+                "response_metadata": {"next_cursor": next_cursor}}
+
+    def conversations_replies(self, channel, ts, limit=100, cursor=None):
+        with self.lock:
+            self.n_replies_calls += 1
+            if self.cancel_after is not None and self.n_replies_calls >= self.cancel_after:
+                self.cancel_event.set()
+        replies = [{"ts": f"{float(ts) + k + 1:.6f}", "user": "U2", "text": f"reply {k}", "thread_ts": ts}
+                   for k in range(self.n_replies)]
+        return {"messages": [{"ts": ts, "user": "U1", "text": "parent"}] + replies,
+                "response_metadata": {"next_cursor": ""}}
+
+
+@pytest.fixture(autouse=True)
+def export_dir(tmp_path, monkeypatch):
+    # run every export in a temporary directory without waiting on the rate limits
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(archivist, "HISTORY_LIMITER", TokenBucket(rate=1000, capacity=1000))
+    monkeypatch.setattr(archivist, "REPLIES_LIMITER", TokenBucket(rate=1000, capacity=1000))
+
+
+def export(client, **kwargs):
+    archivist.export_channel_history(client, {"channel": "C1", "ts": "1.0"}, USER_MAP, CHANNEL_MAP,
+                                     cancel_event=client.cancel_event, max_workers=2, **kwargs)
+
+
+def read_records():
+    with open("channel_export_C1.jsonl") as f:
+        return [json.loads(line) for line in f]
+
+
+def expected_count(n, n_replies=2):
+    return n + len(range(0, n, 3)) * n_replies
+
+
+def test_resumed_export_has_no_duplicates():
+    client = FakeClient(n=45, cancel_after=4)
+    export(client, export_format="jsonl")
+    assert any("stopped exporting" in post for post in client.posts)
+
+    # carry on from the checkpoint
+    client = FakeClient(n=45)
+    export(client, export_format="jsonl")
+    assert client.posts[0].startswith("Picking up the unfinished export")
+
+    timestamps = [record["ts"] for record in read_records()]
+    assert len(timestamps) == len(set(timestamps)) == expected_count(45)
+    parents = [ts for ts, record in zip(timestamps, read_records()) if not record["is_reply"]]
+    assert parents == sorted(parents, key=float)
+
+
+def test_incremental_export_only_adds_new_messages():
+    export(FakeClient(n=20), export_format="jsonl")
+    export(FakeClient(n=32), incremental=True)
+
+    timestamps = [record["ts"] for record in read_records()]
+    assert len(timestamps) == len(set(timestamps)) == expected_count(32)
+
+    client = FakeClient(n=32)
+    export(client, incremental=True)
+    assert "There are no new messages since the last export of this channel!" in client.posts
+    assert len(read_records()) == expected_count(32)
+
+
+def test_incremental_export_refuses_a_different_format():
+    export(FakeClient(n=5), export_format="jsonl")
+    client = FakeClient(n=8)
+    export(client, export_format="text", incremental=True)
+
+    assert any("same format" in post for post in client.posts)
+    assert len(read_records()) == expected_count(5)
+
+
+def test_mentions_are_expanded_in_one_pass():
+    text = "<@U1> and <@U2> in <#C9>, but not <@U404> or <#C404>"
+    assert archivist.expand_mentions(text, USER_MAP, CHANNEL_MAP) \
+        == "@alice and @bob in #random, but not <@U404> or <#C404>"
+
+
+def test_text_export_expands_mentions_and_indents_replies():
+    export(FakeClient(n=3, n_replies=1))
+
+    with open("channel_export_C1.txt") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 4
+    assert lines[0].endswith("@alice: message 0 for @bob in #random")
+    assert lines[1].startswith("    → ") and lines[1].endswith("@bob: reply 0")
@@ -0,0 +1,61 @@
+from directory import WorkspaceDirectory
+
+
+class FakeClient:
+    """Serves users and channels over two pages each, counting every request"""
+    def __init__(self):
+        self.calls = []
+
+    def users_list(self, cursor=None, **kwargs):
+        self.calls.append("users_list")
+        if cursor is None:
+            return {"members": [{"id": "U1", "name": "alice"}], "response_metadata": {"next_cursor": "p2"}}
+        return {"members": [{"id": "U2", "name": "bob"}], "response_metadata": {"next_cursor": ""}}
+
+    def conversations_list(self, cursor=None, **kwargs):
+        self.calls.append("conversations_list")
+        if cursor is None:
+            return {"channels": [{"id": "C1", "name": "general"}], "response_metadata": {"next_cursor": "p2"}}
+        return {"channels": [{"id": "C2", "name": "random"}], "response_metadata": {}}
+
+
+def test_every_page_is_fetched_once_and_indexed_both_ways():
+    client = FakeClient()
+    directory = WorkspaceDirectory(client)
+
+    assert directory.username("U2") == "bob"
+    assert directory.user_id("alice") == "U1"
+    assert directory.channel_id("random") == "C2"
+    assert directory.channel_name("C1") == "general"
+    assert directory.username("U3") is None
+    assert client.calls == ["users_list", "users_list", "conversations_list", "conversations_list"]
+
+
+def test_updates_replace_the_old_name():
+    client = FakeClient()
+    directory = WorkspaceDirectory(client)
+    directory.user_names()
+    directory.channel_names()
+
+    directory.update_user({"id": "U1", "name": "alicia"})
+    directory.update_channel("C1", "announcements")
+
+    assert directory.username("U1") == "alicia"
+    assert directory.user_id("alice") is None
+    assert directory.channel_id("announcements") == "C1"
+    assert directory.channel_id("general") is None
+
+
+def test_cache_is_refetched_after_invalidating_or_expiring():
+    client = FakeClient()
+    directory = WorkspaceDirectory(client)
+
+    directory.user_names()
+    directory.invalidate_users()
+    directory.user_names()
+    assert client.calls.count("users_list") == 4
+
+    expired = WorkspaceDirectory(client, ttl=0)
+    expired.channel_names()
+    expired.channel_names()
+    assert client.calls.count("conversations_list") == 4
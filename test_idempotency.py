@@ -0,0 +1,43 @@
+from idempotency import RecentEvents
+
+
+def test_the_same_event_is_only_claimed_once():
+    events = RecentEvents()
+
+    assert events.first_time("Ev1")
+    assert not events.first_time("Ev1")
+    assert events.first_time("Ev2")
+
+
+def test_only_new_actions_are_claimed_for_an_edited_message():
+    events = RecentEvents()
+
+    assert events.claim(("C1", "1.0"), ["emoji"]) == ["emoji"]
+    assert events.claim(("C1", "1.0"), ["emoji", "quote", "quote"]) == ["quote"]
+    assert events.claim(("C1", "1.0"), ["emoji", "quote"]) == []
+    assert events.claim(None, ["emoji", "emoji"]) == ["emoji"]
+
+
+def test_least_recently_used_keys_are_forgotten():
+    events = RecentEvents(max_size=2)
+    events.first_time("a")
+    events.first_time("b")
+    events.first_time("a")
+    events.first_time("c")
+
+    # "b" was the least recently used so it was dropped to make room for "c"
+    assert not events.first_time("a")
+    assert events.first_time("b")
+
+
+def test_keys_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("idempotency.time.monotonic", lambda: now[0])
+    events = RecentEvents(ttl=60)
+    events.first_time("Ev1")
+
+    now[0] += 30
+    assert not events.first_time("Ev1")
+
+    now[0] += 61
+    assert events.first_time("Ev1")
@@ -0,0 +1,60 @@
+import threading
+
+from jobs import JobRunner
+
+
+class FakeClient:
+    def __init__(self):
+        self.posts = []
+        self.updates = []
+
+    def chat_postMessage(self, text, **kwargs):
+        self.posts.append(text)
+        return {"ts": f"{len(self.posts)}.0"}
+
+    def chat_update(self, text, ts, **kwargs):
+        self.updates.append((ts, text))
+
+
+def test_third_job_from_the_same_user_is_refused():
+    client = FakeClient()
+    runner = JobRunner(client, max_workers=4, max_per_user=2)
+    release = threading.Event()
+    try:
+        first = runner.submit("export", release.wait, user="U1", channel="C1", thread_ts="1.0")
+        second = runner.submit("export", release.wait, user="U1", channel="C1", thread_ts="2.0")
+        third = runner.submit("export", release.wait, user="U1", channel="C1", thread_ts="3.0")
+        other_user = runner.submit("export", release.wait, user="U2", channel="C1", thread_ts="4.0")
+
+        assert first is not None and second is not None and other_user is not None
+        assert third is None
+        assert "already got 2 jobs" in client.posts[-1]
+    finally:
+        release.set()
+        runner.shutdown()
+
+
+def test_jobs_can_be_cancelled_and_report_their_status():
+    client = FakeClient()
+    runner = JobRunner(client)
+    started, stopped = threading.Event(), threading.Event()
+
+    def work():
+        job = runner.current_job()
+        job.post_status("starting")
+        job.post_status("halfway")
+        started.set()
+        job.cancel_event.wait(5)
+        stopped.set()
+
+    try:
+        job = runner.submit("papers", work, user="U1", channel="C1", thread_ts="1.0")
+        assert started.wait(5)
+        assert job.status == "halfway"
+        assert client.posts == ["starting"] and client.updates == [("1.0", "halfway")]
+
+        assert runner.cancel(name="papers", channel="C1") == [job]
+        assert stopped.wait(5)
+    finally:
+        runner.shutdown()
+    assert runner.active_jobs() == []
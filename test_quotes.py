@@ -0,0 +1,50 @@
+import datetime
+
+import pytest
+
+import quotes
+
+
+@pytest.fixture
+def store(tmp_path):
+    with open(tmp_path / "quotes.csv", "w") as f:
+        f.write("|quote|person|date\n0|Hello|Alice|2020-01-01 10:00:00\n1|Goodbye|Bob|not a date\n")
+    return quotes.QuoteStore(path=str(tmp_path / "quotes.db"), csv_path=str(tmp_path / "quotes.csv"))
+
+
+def test_csv_dates_are_migrated_to_days(store):
+    store.weeks_remaining(datetime.date(2024, 1, 1))
+    rows = store.connection.execute("SELECT quote, person, last_used FROM quotes ORDER BY id").fetchall()
+
+    assert rows == [("Hello", "Alice", "2020-01-01"), ("Goodbye", "Bob", quotes.NEVER_USED)]
+
+
+def test_picked_quotes_cool_down_before_coming_back(store):
+    today = datetime.date(2024, 1, 1)
+    picked = {store.pick(today), store.pick(today)}
+
+    assert picked == {("Hello", "Alice"), ("Goodbye", "Bob")}
+    assert store.pick(today + datetime.timedelta(days=quotes.COOLDOWN_DAYS)) == (None, None)
+
+    # the pool refills once the cooldown is over
+    assert store.pick(today + datetime.timedelta(days=quotes.COOLDOWN_DAYS + 1)) in picked
+
+
+def test_added_quotes_can_be_picked_straight_away(store):
+    today = datetime.date(2024, 1, 1)
+    store.pick(today)
+    store.pick(today)
+    store.add("New one", "Carol")
+
+    assert store.pick(today) == ("New one", "Carol")
+    assert store.pick(today) == (None, None)
+
+
+def test_weeks_remaining_counts_quotes_that_cool_down_in_time(store):
+    # quotes are released using the real date so this has to start from today
+    today = datetime.date.today()
+    store.pick(today)
+
+    # one quote is left for next week, then nothing until the first has cooled down
+    assert store.weeks_remaining(today + datetime.timedelta(weeks=1), max_weeks=4) == 1
+    assert store.weeks_remaining(today + datetime.timedelta(days=quotes.COOLDOWN_DAYS + 1), max_weeks=4) == 2
@@ -0,0 +1,32 @@
+import triggers
+
+
+def test_every_overlapping_trigger_is_found():
+    pattern = triggers.compile_triggers([(r"\bcat\b", False), (r"\bcat\w*", False), (r"\bdog\b", False)])
+
+    assert triggers.find_triggers(pattern, "A Cat and a catalogue") == [0, 1]
+    assert triggers.find_triggers(pattern, "dog then cats") == [1, 2]
+    assert triggers.find_triggers(pattern, "nothing here") == []
+
+
+def test_case_sensitivity_is_per_trigger():
+    pattern = triggers.compile_triggers([(r"\bMANUAL\b", True), (r"\bhello\b", False)])
+
+    assert triggers.find_triggers(pattern, "manual HELLO") == [1]
+    assert triggers.find_triggers(pattern, "MANUAL hello") == [0, 1]
+
+
+def test_emojis_are_stripped_before_matching():
+    pattern = triggers.compile_triggers([(r"\bparty\b", False)])
+
+    assert triggers.find_triggers(pattern, "time to :party: now") == []
+    assert triggers.find_triggers(pattern, "time to :party: now", strip_emojis=False) == [0]
+
+
+def test_keyword_matcher_returns_the_highest_priority_group():
+    matcher = triggers.KeywordMatcher([["happy birthday"], ["birthday", "bday"], ["he"]])
+
+    assert matcher.first_match("Wishing you a HAPPY birthday") == 0
+    assert matcher.first_match("it's my bday soon") == 1
+    assert matcher.first_match("ushers") == 2
+    assert matcher.first_match("nope") is None
@@ -0,0 +1,134 @@
+import re
+from collections import deque
+
+# this regex means at least one character that isn't a : between two : (i.e. an emoji)
+EMOJI_REGEX = re.compile(r":[^:]+:")
+
+
+def compile_triggers(trigger_table):
+    """Compile a table of trigger regular expressions into a single combined pattern
+
+    The pattern first uses a lookahead on the alternation of every trigger to jump straight to the next
+    position at which *any* trigger matches. It then tries each trigger as an optional lookahead at that
+    position, so every trigger that starts there is captured in its own named group (``t0``, ``t1``, ...).
+
+    Parameters
+    ----------
+    trigger_table : `list` of `tuples`
+        Each tuple is (regex, case_sensitive) for a single trigger
+
+    Returns
+    -------
+    pattern : `re.Pattern`
+        Combined compiled pattern, use with :func:`find_triggers`
+    """
+    # scope the case sensitivity to each individual trigger
+    regexes = [regex if case_sensitive else f"(?i:{regex})" for regex, case_sensitive in trigger_table]
+
+    gate = "(?=" + "|".join(regexes) + ")"
+    captures = "".join(f"(?:(?=(?P<t{i}>{regex})))?" for i, regex in enumerate(regexes))
+    return re.compile(gate + captures)
+
+
+def find_triggers(pattern, text, strip_emojis=True):
+    """Find every trigger that matches a piece of text in a single pass
+
+    Parameters
+    ----------
+    pattern : `re.Pattern`
+        Combined pattern from :func:`compile_triggers`
+    text : `str`
+        Text to search
+    strip_emojis : `bool`, optional
+        Whether to remove emojis from the text before searching, by default True
+
+    Returns
+    -------
+    matched : `list` of `int`
+        Sorted indices (into the original trigger table) of every trigger that matched
+    """
+    if strip_emojis:
+        text = EMOJI_REGEX.sub("--", text)
+
+    matched = set()
+    pos = 0
+    while True:
+        match = pattern.search(text, pos)
+        if match is None:
+            break
+
+        # record every trigger that matched at this position and then move on by a character
+        matched.update(int(group[1:]) for group, value in match.groupdict().items() if value is not None)
+        pos = match.start() + 1
+    return sorted(matched)
+
+
+class KeywordMatcher:
+    """An Aho-Corasick automaton for finding which of several groups of phrases appear in some text
+
+    Every phrase of every group is built into one automaton up front, so checking a message is a single
+    scan over its (lower case) characters no matter how many phrases there are.
+
+    Parameters
+    ----------
+    groups : `list` of `lists`
+        Each list is a group of phrases, in order of priority (phrases are matched case insensitively)
+    """
+    def __init__(self, groups):
+        self.n_groups = len(groups)
+
+        # build a trie of every phrase, with each node storing the best group that ends there
+        self.goto = [{}]
+        self.output = [self.n_groups]
+        for group, phrases in enumerate(groups):
+            for phrase in phrases:
+                node = 0
+                for char in phrase.lower():
+                    if char not in self.goto[node]:
+                        self.goto[node][char] = len(self.goto)
+                        self.goto.append({})
+                        self.output.append(self.n_groups)
+                    node = self.goto[node][char]
+                self.output[node] = min(self.output[node], group)
+
+        # add the failure links breadth first (so shorter suffixes are always done first)
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while len(queue) > 0:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback != 0 and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+
+                # anything that matches at the failure node also matches here
+                self.output[child] = min(self.output[child], self.output[self.fail[child]])
+
+    def first_match(self, text):
+        """Find the highest priority group with a phrase in some text
+
+        Parameters
+        ----------
+        text : `str`
+            Text to search
+
+        Returns
+        -------
+        group : `int`
+            Index of the group (None if nothing matches)
+        """
+        best = self.n_groups
+        node = 0
+        for char in text.lower():
+            while node != 0 and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            if self.output[node] < best:
+                best = self.output[node]
+
+                # can't do any better than the first group
+                if best == 0:
+                    break
+        return best if best < self.n_groups else None
@@ -1,42 +1,166 @@
-import numpy as np
+import contextlib
+import os
+import random
+import threading
 
+try:
+    import fcntl
+except ImportError:     # not available on Windows
+    fcntl = None
 
-def get_hosts(with_countdown=False):
-    hosts, countdown = None, None
-    with open("public_data/whinetime_order.txt", "r") as f:
-        hosts = f.readline().split(",")
-        hosts = [host.rstrip() for host in hosts]
-        if with_countdown:
-            countdown = int(f.readline())
 
+class HostRotation:
+    """The order of whinetime hosts and how many more rotations until it is shuffled again
+
+    The order is kept in memory so looking up hosts only needs to check whether the file has changed (in
+    case it was edited by hand or by another copy of Gerald), in which case it is read again. Changes are
+    made one at a time (with a thread lock, plus a file lock in case more than one copy of Gerald is
+    running) and saved by writing a temporary file and renaming it over the old one, so the file is never
+    left half-written.
+
+    The file has the hosts on the first line (comma separated) and the countdown on the second.
+
+    Parameters
+    ----------
+    path : `str`, optional
+        Path to the file, by default "public_data/whinetime_order.txt"
+    """
+    def __init__(self, path="public_data/whinetime_order.txt"):
+        self.path = path
+        self.lock = threading.Lock()
+        self._hosts = None
+        self._countdown = None
+        self._file_id = None
+
+    def _read(self):
+        with open(self.path, "r") as f:
+            self._hosts = [host.rstrip() for host in f.readline().split(",")]
+            self._countdown = int(f.readline())
+            self._file_id = file_id(f.fileno())
+
+    def _write(self, hosts, countdown):
+        with open(self.path + ".tmp", "w") as f:
+            f.writelines([','.join(hosts) + '\n', str(countdown)])
+            f.flush()
+            os.fsync(f.fileno())
+            new_id = file_id(f.fileno())
+        os.replace(self.path + ".tmp", self.path)
+        self._hosts, self._countdown, self._file_id = hosts, countdown, new_id
+
+    def _changed(self):
+        # whether we haven't read the file yet or it has changed since we last read or wrote it
+        return self._hosts is None or file_id(self.path) != self._file_id
+
+    def _refresh(self):
+        # read the file again if it has changed (call with both locks held)
+        if self._changed():
+            self._read()
+
+            # if it was left needing a shuffle then do that now
+            if self._countdown <= 0:
+                self._shuffle()
+
+    def _snapshot(self):
+        # get a consistent copy of the order and countdown, only taking the file lock if we need to read it
+        with self.lock:
+            if self._changed():
+                with self._file_lock():
+                    self._refresh()
+            return list(self._hosts), self._countdown
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _update(self, change):
+        # make a change to the order with no one else changing it at the same time
+        with self.lock, self._file_lock():
+            # someone else (e.g. another copy of Gerald) may have changed the file since we last read it
+            self._refresh()
+            change()
+
+            # read the result while we still hold the locks so no one else's change can sneak in
+            return list(self._hosts)
+
+    def _shuffle(self):
+        hosts = list(self._hosts)
+        random.shuffle(hosts)
+        self._write(hosts, len(hosts))
+
+    def _rotate(self):
+        hosts = self._hosts[1:] + self._hosts[:1]
+        countdown = self._countdown - 1
+
+        # shuffle the order once everyone has had a turn
+        if countdown <= 0:
+            random.shuffle(hosts)
+            countdown = len(hosts)
+        self._write(hosts, countdown)
+
+    @property
+    def hosts(self):
+        """The hosts in the order they'll host (a copy)"""
+        return self._snapshot()[0]
+
+    @property
+    def countdown(self):
+        """How many more rotations until the order is shuffled"""
+        return self._snapshot()[1]
+
+    def hosts_and_countdown(self):
+        """The hosts (a copy) and the countdown, both from the same moment"""
+        return self._snapshot()
+
+    def randomise(self):
+        """Shuffle the order of the hosts and restart the countdown (returning the new order)"""
+        return self._update(self._shuffle)
+
+    def rotate(self):
+        """Move the next host to the back of the queue (shuffling if everyone has had a turn)
+
+        Returns
+        -------
+        next_host : `str`
+            The host that is now next, as of this rotation
+        """
+        return self._update(self._rotate)[0]
+
+
+def file_id(file):
+    """Get something that changes whenever a file is replaced (its inode and modification time)"""
+    stat = os.stat(file)
+    return stat.st_ino, stat.st_mtime_ns
+
+
+ROTATION = HostRotation()
+
+
+def get_hosts(with_countdown=False):
     if with_countdown:
-        return hosts, countdown
+        return ROTATION.hosts_and_countdown()
     else:
-        return hosts
+        return ROTATION.hosts
 
 
 def randomise_hosts():
-    hosts = get_hosts(with_countdown=False)
-    np.random.shuffle(hosts)
-    with open("public_data/whinetime_order.txt", "w") as f:
-        f.writelines([','.join(hosts) + '\n', str(len(hosts))])
-    return hosts
+    return ROTATION.randomise()
+
 
 def rotate_hosts():
-    hosts, countdown = get_hosts(with_countdown=True)
-    new_hosts = hosts[1:] + hosts[:1]
-    countdown -= 1
-    with open("public_data/whinetime_order.txt", "w") as f:
-        f.writelines([','.join(new_hosts) + '\n', str(countdown)])
+    return ROTATION.rotate()
 
 
 def get_next_host():
-    hosts, countdown = get_hosts(with_countdown=True)
-    if countdown <= 0:
-        hosts = randomise_hosts()
-    return hosts[0]
+    return ROTATION.hosts[0]
 
 
 def weeks_until_host(host):
-    hosts = get_hosts()
-    return hosts.index(host)
\ No newline at end of file
+    return ROTATION.hosts.index(host)